@@ -0,0 +1,189 @@
+''' Benchmarks for the sudoku encodings
+
+	Times clause construction, solving and decoding separately with a monotonic clock, over
+	several repeats after warmup runs, for each encoding and order n.  The grids are blank
+	grids of each order or the puzzles of a corpus file.  Results are summarized as medians
+	and percentiles and can be written as JSON or CSV to track regressions.
+
+	python bench.py --encodings satoku basic onehot weber --orders 2 3 --repeats 5 --json out.json
+
+	dlx is not an encoding but the exact cover backend of dlx.py, timed the same way so the two
+	can be compared; its formula size is counted in rows, nodes and columns.
+'''
+from __future__ import print_function
+
+import argparse
+import csv
+import json
+import numpy as np
+
+import pycosat
+
+import dlx
+
+from buildstats import clock
+# the encodings are registered in registry.py, orderOf and givens stay importable from here
+from registry import encodings, solvers, givens, orderOf
+
+phases = ('construct', 'solve', 'decode')
+percentiles = (50, 90, 99)
+
+def blankGrid(n):
+	return [ [0]*n**2 for r in range(n**2) ]
+
+def parsePuzzle(line):
+	''' parses one puzzle per line, 81 characters for 9x9 with '.' or '0' for blanks,
+		or comma / space separated numbers for any order
+	'''
+	line = line.strip()
+	if ',' in line or ' ' in line:
+		values = [ int(x) if x not in ('.', '') else 0 for x in line.replace(',', ' ').split() ]
+	else:
+		values = [ 0 if x == '.' else int(x) for x in line ]
+	n_sqr = int(round(len(values)**0.5))
+	return [ values[r*n_sqr:(r+1)*n_sqr] for r in range(n_sqr) ]
+
+def formatPuzzle(grid, sep=None):
+	''' inverse of parsePuzzle, 81 characters for 9x9 and comma separated numbers otherwise,
+		or numbers separated by sep when it is given
+	'''
+	values = [ val for row in grid for val in row ]
+	if sep is None and len(grid) <= 9:
+		return ''.join( str(val) if val else '.' for val in values )
+	return (sep or ',').join( str(val) for val in values )
+
+def loadCorpus(path, limit=None):
+	''' returns the puzzles of a corpus file, skipping blank and '#' comment lines
+	'''
+	puzzles = []
+	with open(path) as f:
+		for line in f:
+			if not line.strip() or line.startswith('#'):
+				continue
+			puzzles.append(parsePuzzle(line))
+			if limit is not None and len(puzzles) == limit:
+				break
+	return puzzles
+
+def formulaSize(cnf):
+	# for the exact cover the rows, nodes and columns stand in for clauses, literals and variables
+	if cnf is None:
+		return {'clauses': 0, 'literals': 0, 'variables': 0}
+	if isinstance(cnf, dlx.ExactCover):
+		return {'clauses': cnf.nRows, 'literals': cnf.nRows*cnf.width, 'variables': cnf.nColumns}
+	return {
+		'clauses': len(cnf),
+		'literals': sum( len(clause) for clause in cnf ),
+		'variables': max( abs(l) for clause in cnf for l in clause ),
+	}
+
+def timeOnce(encoding, grid):
+	''' builds, solves and decodes grid once, returns the phase times and formula size
+	'''
+	build, decode, orders = encodings[encoding]
+	start = clock()
+	cnf = build(grid)
+	t1 = clock()
+	model = solvers.get(encoding, pycosat.solve)(cnf)
+	t2 = clock()
+	if model != 'UNSAT':
+		decode(model, grid)
+	t3 = clock()
+	
+	size = formulaSize(cnf)
+	size['sat'] = model != 'UNSAT'
+	return {'construct': t1 - start, 'solve': t2 - t1, 'decode': t3 - t2}, size
+
+def summarize(samples):
+	''' returns the count, mean, min, max and percentiles of a list of times
+	'''
+	samples = np.asarray(samples, dtype=float)
+	summary = {
+		'count': len(samples),
+		'mean': float(samples.mean()),
+		'min': float(samples.min()),
+		'max': float(samples.max()),
+	}
+	for p in percentiles:
+		summary['p%d' % p] = float(np.percentile(samples, p))
+	summary['median'] = summary['p50']
+	return summary
+
+def run(encodingNames=('satoku', 'basic', 'onehot', 'weber', 'dlx'), orders=(2, 3), puzzles=None, repeats=5, warmup=1):
+	''' benchmarks every encoding on every grid, returns a list of result rows
+
+		puzzles is a list of grids, their orders take the place of orders when given
+		each row is one (encoding, n, phase) with the summary of its times
+	'''
+	if puzzles is None:
+		puzzles = [ blankGrid(n) for n in orders ]
+	rows = []
+	
+	for encoding in encodingNames:
+		supported = encodings[encoding][2]
+		byOrder = {}
+		for grid in puzzles:
+			n = orderOf(grid)
+			if supported is not None and n not in supported:
+				continue
+			for i in range(warmup):
+				timeOnce(encoding, grid)
+			for i in range(max(repeats, 1)):
+				times, size = timeOnce(encoding, grid)
+				entry = byOrder.setdefault(n, {'times': dict( (p, []) for p in phases ), 'size': size, 'puzzles': 0})
+				for phase in phases:
+					entry['times'][phase].append(times[phase])
+			entry['puzzles'] += 1
+		
+		for n in sorted(byOrder):
+			entry = byOrder[n]
+			for phase in phases + ('total',):
+				if phase == 'total':
+					samples = np.sum([ entry['times'][p] for p in phases ], axis=0)
+				else:
+					samples = entry['times'][phase]
+				row = {'encoding': encoding, 'n': n, 'phase': phase, 'puzzles': entry['puzzles']}
+				row.update(entry['size'])
+				row.update(summarize(samples))
+				rows.append(row)
+	return rows
+
+columns = ['encoding', 'n', 'phase', 'puzzles', 'clauses', 'literals', 'variables', 'sat', 'count', 'mean', 'min', 'median', 'p90', 'p99', 'max']
+
+def writeJSON(rows, path):
+	with open(path, 'w') as f:
+		json.dump(rows, f, indent=1, sort_keys=True)
+
+def writeCSV(rows, path):
+	with open(path, 'w') as f:
+		writer = csv.DictWriter(f, columns, extrasaction='ignore')
+		writer.writeheader()
+		writer.writerows(rows)
+
+def printTable(rows):
+	print('%-8s %3s %-9s %9s %10s %12s %12s %12s' % ('encoding', 'n', 'phase', 'clauses', 'literals', 'median', 'p90', 'p99'))
+	for row in rows:
+		print('%-8s %3d %-9s %9d %10d %12.6f %12.6f %12.6f' % (row['encoding'], row['n'], row['phase'], row['clauses'], row['literals'], row['median'], row['p90'], row['p99']))
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='benchmark the sudoku encodings')
+	parser.add_argument('--encodings', nargs='+', default=['satoku', 'basic', 'onehot', 'weber', 'dlx'], choices=sorted(encodings))
+	parser.add_argument('--orders', nargs='+', type=int, default=[2, 3], help='orders of the blank grids to time')
+	parser.add_argument('--corpus', help='file with one puzzle per line, replaces the blank grids')
+	parser.add_argument('--limit', type=int, help='number of corpus puzzles to use')
+	parser.add_argument('--repeats', type=int, default=5)
+	parser.add_argument('--warmup', type=int, default=1)
+	parser.add_argument('--json', help='write the results as JSON')
+	parser.add_argument('--csv', help='write the results as CSV')
+	args = parser.parse_args(argv)
+	
+	puzzles = loadCorpus(args.corpus, args.limit) if args.corpus else None
+	rows = run(args.encodings, args.orders, puzzles, args.repeats, args.warmup)
+	printTable(rows)
+	if args.json:
+		writeJSON(rows, args.json)
+	if args.csv:
+		writeCSV(rows, args.csv)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,143 @@
+''' Per-phase statistics for the cnf builders
+
+	A BuildStats passed to a builder records, for each phase of the construction (handles, rows,
+	columns, groups, null values, ...) and for the solve and decode steps that follow, the wall
+	time, the tracemalloc peak and the number of clauses, literals and variables it produced.
+	tracemalloc is only available on Python 3, without it the memory figures are None.
+
+	The variables of a phase are the distinct variables its clauses use, and the phases share
+	most of them (every phase touches the cell bits), so unlike the clauses and literals they
+	do not add up to the variables of the formula and total() refuses to sum them.
+'''
+import time
+import numpy as np
+
+try:
+	import tracemalloc
+except ImportError:
+	tracemalloc = None
+
+from clausebuffer import ClauseBuffer
+
+# the one monotonic clock of the package, time.clock is gone from Python 3 and perf_counter
+# is missing from Python 2
+clock = getattr(time, 'perf_counter', time.time)
+
+def literalCount(cnf, startClause):
+	''' returns the literals and distinct variables of cnf[startClause:]
+	'''
+	if isinstance(cnf, ClauseBuffer):
+		lits = cnf.lits[cnf.offsets[startClause]:]
+		return len(lits), len(np.unique(np.abs(lits)))
+	variables = set()
+	literals = 0
+	for clause in cnf[startClause:]:
+		literals += len(clause)
+		variables.update( abs(l) for l in clause )
+	return literals, len(variables)
+
+class BuildStats(object):
+	''' timing, memory and size of each phase of a build, solve and decode
+	'''
+	def __init__(self, memory=True):
+		self.memory = memory and tracemalloc is not None
+		self.order = [] # phase names in the order they ran
+		self.phases = {} # name -> dict of figures
+		self._current = None
+		
+	def begin(self, name, cnf=None):
+		''' ends the running phase and starts timing name, clauses added to cnf count toward it
+		'''
+		self.end(cnf)
+		self._current = name
+		self._clauses = len(cnf) if cnf is not None else 0
+		self._traced = False
+		if self.memory:
+			if not tracemalloc.is_tracing():
+				tracemalloc.start()
+				self._traced = True
+			if hasattr(tracemalloc, 'reset_peak'):
+				tracemalloc.reset_peak()
+			self._memory = tracemalloc.get_traced_memory()[0]
+		self._start = clock()
+		
+	def end(self, cnf=None):
+		''' ends the running phase, if any
+		'''
+		if self._current is None:
+			return
+		elapsed = clock() - self._start
+		peak = None
+		if self.memory:
+			peak = max(tracemalloc.get_traced_memory()[1] - self._memory, 0)
+			if self._traced:
+				tracemalloc.stop()
+		
+		clauses = literals = variables = 0
+		if cnf is not None:
+			clauses = len(cnf) - self._clauses
+			literals, variables = literalCount(cnf, self._clauses)
+			
+		name = self._current
+		self._current = None
+		if name not in self.phases:
+			self.order.append(name)
+			self.phases[name] = {'time': 0.0, 'peak': peak, 'clauses': 0, 'literals': 0, 'variables': 0}
+		figures = self.phases[name]
+		figures['time'] += elapsed
+		if peak is not None:
+			figures['peak'] = max(figures['peak'] or 0, peak)
+		figures['clauses'] += clauses
+		figures['literals'] += literals
+		figures['variables'] += variables
+		
+	def phase(self, name, cnf=None):
+		''' context manager timing one phase
+		'''
+		return _Phase(self, name, cnf)
+		
+	def total(self, key):
+		''' returns the sum of key over the phases, clauses, literals, time or peak
+		'''
+		if key == 'variables':
+			raise ValueError('the variables of the phases overlap, their sum is not the variables of the formula')
+		return sum( self.phases[name][key] or 0 for name in self.order )
+		
+	def asDict(self):
+		return dict( (name, dict(self.phases[name])) for name in self.order )
+		
+	def report(self):
+		''' returns the figures as a printable table
+		'''
+		lines = ['%-12s %10s %12s %10s %11s %10s' % ('phase', 'time', 'peak bytes', 'clauses', 'literals', 'variables')]
+		for name in self.order:
+			f = self.phases[name]
+			peak = '-' if f['peak'] is None else str(f['peak'])
+			lines.append('%-12s %10.6f %12s %10d %11d %10d' % (name, f['time'], peak, f['clauses'], f['literals'], f['variables']))
+		return '\n'.join(lines)
+
+class _Phase(object):
+	def __init__(self, stats, name, cnf):
+		self.stats, self.name, self.cnf = stats, name, cnf
+	def __enter__(self):
+		self.stats.begin(self.name, self.cnf)
+	def __exit__(self, *exc):
+		self.stats.end(self.cnf)
+
+class NullStats(object):
+	''' stand-in used when no stats are requested, every call does nothing
+	'''
+	def begin(self, name, cnf=None):
+		pass
+	def end(self, cnf=None):
+		pass
+	def phase(self, name, cnf=None):
+		return _NullPhase()
+
+class _NullPhase(object):
+	def __enter__(self):
+		pass
+	def __exit__(self, *exc):
+		pass
+
+noStats = NullStats()
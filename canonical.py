@@ -0,0 +1,103 @@
+''' Canonical forms of grids under the validity preserving symmetries
+
+	Relabeling the digits, transposing, permuting bands, stacks, the rows of a band and the
+	columns of a stack all map puzzles to puzzles with correspondingly mapped solutions.  The
+	canonical form of a grid is the lexicographically smallest grid it can be mapped to, after
+	relabeling the digits in order of first appearance, among the layouts whose bands, rows,
+	stacks and columns are sorted by invariants of their givens.  Only layouts tied on every
+	invariant are compared, which for puzzles leaves few candidates.  When the ties allow more
+	than maxCandidates layouts (near blank or full grids) the first ones are used instead, the
+	result is then still a valid transform of the grid but equivalent grids may map to
+	different forms.
+
+	canon, transform = canonicalize(grid)
+	solution = inverse(transform, canonicalSolution)
+'''
+import itertools
+import numpy as np
+
+maxCandidates = 1 << 12 # layouts compared at most per orientation
+
+def _tieOrders(keys):
+	''' returns every order of range(len(keys)) sorting keys descending, permuting ties
+	'''
+	order = sorted(range(len(keys)), key=lambda i: keys[i], reverse=True)
+	groups = [ list(g) for k, g in itertools.groupby(order, key=lambda i: keys[i]) ]
+	for perms in itertools.product(*[ itertools.permutations(g) for g in groups ]):
+		yield [ i for p in perms for i in p ]
+
+def _linePermutations(filled, n, limit):
+	''' returns up to limit permutations of the lines (rows of filled) that sort the bands and
+		the lines within each band by their invariants, as an array of line orders
+	'''
+	# a line is described by its given count and the sorted given counts of its n segments,
+	# neither changes under permutations of the other axis
+	segments = filled.reshape(n**2, n, n).sum(axis=2)
+	lineKeys = [ (int(s.sum()),) + tuple(sorted(s.tolist())) for s in segments ]
+	bandKeys = [ tuple(sorted(lineKeys[b*n:(b + 1)*n])) for b in range(n) ]
+
+	orders = []
+	for bands in _tieOrders(bandKeys):
+		within = [ [ [ b*n + i for i in o ] for o in _tieOrders(lineKeys[b*n:(b + 1)*n]) ] for b in bands ]
+		for lines in itertools.product(*within):
+			orders.append( [ l for band in lines for l in band ] )
+			if len(orders) == limit:
+				return np.array(orders)
+	return np.array(orders)
+
+def relabel(candidates, n_sqr):
+	''' relabels the digits of each flattened candidate in order of first appearance
+		returns the relabeled candidates and the digit maps, map[k, old] = new
+	'''
+	K, size = candidates.shape
+	digits = np.arange(1, n_sqr + 1)
+	present = candidates[:, :, None] == digits
+	first = np.where(present.any(axis=1), present.argmax(axis=1), size)
+	rank = np.argsort(np.argsort(first, axis=1, kind='stable'), axis=1, kind='stable')
+	maps = np.zeros( (K, n_sqr + 1), dtype=np.int64 )
+	maps[:, 1:] = rank + 1
+	return maps[np.arange(K)[:, None], candidates], maps
+
+def canonicalize(grid):
+	''' returns (canonical grid, transform) with apply(transform, grid) == canonical grid
+	'''
+	P = np.asarray(grid, dtype=np.int64)
+	n_sqr = len(P)
+	n = int(round(n_sqr**0.5))
+	best = None
+	for transpose in (False, True):
+		Q = P.T if transpose else P
+		filled = Q > 0
+		rows = _linePermutations(filled, n, maxCandidates)
+		cols = _linePermutations(filled.T, n, max(maxCandidates // len(rows), 1))
+		candidates = Q[rows[:, None, :, None], cols[None, :, None, :]].reshape(len(rows)*len(cols), n_sqr**2)
+		relabeled, maps = relabel(candidates, n_sqr)
+		# lexicographic minimum, np.lexsort takes the most significant key last
+		k = np.lexsort(relabeled.T[::-1])[0]
+		if best is None or tuple(relabeled[k]) < tuple(best[0]):
+			best = (relabeled[k], (transpose, rows[k // len(cols)].tolist(), cols[k % len(cols)].tolist(), maps[k].tolist()))
+	return best[0].reshape(n_sqr, n_sqr).tolist(), best[1]
+
+def apply(transform, grid):
+	''' maps a grid through a transform from canonicalize
+	'''
+	transpose, rows, cols, digits = transform
+	Q = np.asarray(grid, dtype=np.int64)
+	if transpose:
+		Q = Q.T
+	return np.asarray(digits)[Q[np.ix_(rows, cols)]].tolist()
+
+def inverse(transform, grid):
+	''' maps a grid in canonical coordinates back, inverse(t, apply(t, g)) == g
+	'''
+	transpose, rows, cols, digits = transform
+	back = np.zeros(len(digits), dtype=np.int64)
+	back[digits] = np.arange(len(digits))
+	Q = np.empty( (len(rows), len(cols)), dtype=np.int64 )
+	Q[np.ix_(rows, cols)] = back[np.asarray(grid, dtype=np.int64)]
+	return (Q.T if transpose else Q).tolist()
+
+def key(canon):
+	''' string key of a canonical grid
+	'''
+	return ','.join( str(val) for row in canon for val in row )
@@ -0,0 +1,277 @@
+''' Compact storage for cnf clauses
+
+	A ClauseBuffer keeps every literal in one growable int32 array and the start of each clause
+	in an offset array, instead of a Python list per clause holding Python ints.  Generators
+	append to it like a list, numpy clause blocks are copied in with one array assignment, and
+	toList() does the single conversion pycosat needs at the end.  Iterating over a buffer converts
+	one run of clauses at a time instead.
+
+	A SpillBuffer does the same with a bounded amount of memory, moving clauses to files as it
+	fills up, for instances that do not fit.
+'''
+import os
+import tempfile
+import numpy as np
+
+chunkClauses = 1 << 16 # clauses per run when a buffer is read back a piece at a time
+
+class ClauseBuffer(object):
+	''' growable CSR store of clauses, clause i is lits[offsets[i]:offsets[i+1]]
+
+		single clauses are staged in a short Python list and moved into the arrays in bulk
+	'''
+	flushSize = 1 << 16 # staged literals before they are moved into the arrays
+	
+	def __init__(self, literals=1024, clauses=256):
+		self._lits = np.empty(max(literals, 1), dtype=np.int32)
+		self._offsets = np.zeros(max(clauses, 1) + 1, dtype=np.int64)
+		self._stored = 0 # clauses in the arrays
+		self._stagedLits = []
+		self._stagedLengths = []
+		
+	@classmethod
+	def fromArrays(cls, lits, offsets):
+		''' returns a ClauseBuffer over existing int32 literal and int64 offset arrays (offsets[0]
+			is 0) without copying them, appending copies them into larger arrays of its own
+		'''
+		cnf = ClauseBuffer(1, 1)
+		cnf._lits = lits
+		cnf._offsets = offsets
+		cnf._stored = len(offsets) - 1
+		return cnf
+		
+	def _flush(self):
+		if not self._stagedLengths:
+			return
+		lengths = self._stagedLengths
+		self._reserve(len(self._stagedLits), len(lengths))
+		start = int(self._offsets[self._stored])
+		self._lits[start:start + len(self._stagedLits)] = self._stagedLits
+		self._offsets[self._stored + 1:self._stored + len(lengths) + 1] = start + np.cumsum(lengths)
+		self._stored += len(lengths)
+		self._stagedLits = []
+		self._stagedLengths = []
+		
+	def _reserve(self, literals, clauses):
+		# grow by doubling so appending stays linear overall
+		used = int(self._offsets[self._stored])
+		if used + literals > len(self._lits):
+			grown = np.empty(max(used + literals, 2*len(self._lits)), dtype=np.int32)
+			grown[:used] = self._lits[:used]
+			self._lits = grown
+		if self._stored + clauses + 1 > len(self._offsets):
+			grown = np.empty(max(self._stored + clauses + 1, 2*len(self._offsets)), dtype=np.int64)
+			grown[:self._stored + 1] = self._offsets[:self._stored + 1]
+			self._offsets = grown
+			
+	@property
+	def nClauses(self):
+		return self._stored + len(self._stagedLengths)
+		
+	@property
+	def nLiterals(self):
+		return int(self._offsets[self._stored]) + len(self._stagedLits)
+		
+	@property
+	def lits(self):
+		''' the literals of every clause back to back
+		'''
+		self._flush()
+		return self._lits[:self._offsets[self._stored]]
+		
+	@property
+	def offsets(self):
+		''' the start of each clause followed by the end of the last one
+		'''
+		self._flush()
+		return self._offsets[:self._stored + 1]
+		
+	def nVars(self):
+		''' the largest variable used
+		'''
+		lits = self.lits
+		# no np.abs, which would copy every literal
+		return max(int(lits.max()), -int(lits.min())) if len(lits) else 0
+		
+	def chunks(self, clauses=chunkClauses):
+		''' yields the clauses in runs of at most that many, as (lits, offsets) with the offsets
+			counted from the start of the run, so a spilled formula is read a piece at a time
+		'''
+		lits, offsets = self.lits, self.offsets
+		for start in range(0, len(offsets) - 1, clauses):
+			part = np.asarray(offsets[start:start + clauses + 1])
+			yield np.asarray(lits[part[0]:part[-1]]), part - part[0]
+			
+	def append(self, clause):
+		''' adds one clause
+		'''
+		self._stagedLits.extend(clause)
+		self._stagedLengths.append(len(clause))
+		if len(self._stagedLits) >= self.flushSize:
+			self._flush()
+		
+	def appendBlock(self, block):
+		''' adds every row of a 2d array as a clause
+		'''
+		self._flush()
+		block = np.asarray(block)
+		rows, width = block.shape
+		self._reserve(rows*width, rows)
+		start = int(self._offsets[self._stored])
+		self._lits[start:start + rows*width] = block.ravel()
+		self._offsets[self._stored + 1:self._stored + rows + 1] = start + width*np.arange(1, rows + 1)
+		self._stored += rows
+		
+	def extend(self, clauses):
+		''' adds a numpy clause block, another ClauseBuffer or an iterable of clauses
+		'''
+		if isinstance(clauses, np.ndarray):
+			self.appendBlock(clauses)
+		elif isinstance(clauses, ClauseBuffer):
+			lits, offsets = clauses.lits, clauses.offsets
+			self._flush()
+			self._reserve(len(lits), len(offsets) - 1)
+			start = int(self._offsets[self._stored])
+			self._lits[start:start + len(lits)] = lits
+			self._offsets[self._stored + 1:self._stored + len(offsets)] = start + offsets[1:]
+			self._stored += len(offsets) - 1
+		else:
+			for clause in clauses:
+				self.append(clause)
+		return self
+		
+	def __len__(self):
+		return self.nClauses
+		
+	def __getitem__(self, i):
+		self._flush()
+		if i < 0:
+			i += self._stored
+		if not 0 <= i < self._stored:
+			raise IndexError('clause index out of range')
+		return self._lits[self._offsets[i]:self._offsets[i+1]].tolist()
+		
+	def __iter__(self):
+		# one run at a time, pycosat.solve takes any iterable of clauses
+		for lits, offsets in self.chunks():
+			lits, offsets = lits.tolist(), offsets.tolist()
+			for i in range(len(offsets) - 1):
+				yield lits[offsets[i]:offsets[i+1]]
+		
+	def toList(self):
+		''' returns the clauses as the list of lists pycosat expects
+		'''
+		lits = self.lits.tolist()
+		offsets = self.offsets.tolist()
+		return [ lits[offsets[i]:offsets[i+1]] for i in range(len(offsets) - 1) ]
+
+class SpillBuffer(ClauseBuffer):
+	''' ClauseBuffer that keeps at most about spillLiterals literals in memory and appends the rest
+		to a literal file and an offset file in directory, for formulas larger than memory
+
+		lits and offsets are read-only memory maps of the files.  Iterating, and so pycosat.solve,
+		and dimacs.writeBuffer read them a run of chunkClauses at a time, toList() still builds
+		every clause in memory so only use it when the formula fits.  close() deletes the files.
+	'''
+	def __init__(self, directory=None, spillLiterals=1 << 22, prefix='clauses'):
+		ClauseBuffer.__init__(self, min(spillLiterals, 1 << 20), min(spillLiterals // 4, 1 << 18))
+		self.spillLiterals = spillLiterals
+		self._ownDirectory = directory is None
+		self.directory = tempfile.mkdtemp(prefix='satoku-') if directory is None else directory
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory)
+		base = os.path.join(self.directory, '%s-%d-%d' % (prefix, os.getpid(), id(self)))
+		self.litsPath, self.offsetsPath = base + '.lits', base + '.offsets'
+		self._litsFile = open(self.litsPath, 'wb')
+		self._offsetsFile = open(self.offsetsPath, 'wb')
+		self._offsetsFile.write(np.zeros(1, dtype=np.int64).tobytes())
+		self._spilledClauses = 0
+		self._spilledLiterals = 0
+		
+	def _spill(self):
+		# moves everything in memory to the end of the files
+		self._flush()
+		used = int(self._offsets[self._stored])
+		self._litsFile.write(self._lits[:used].tobytes())
+		self._offsetsFile.write( (self._offsets[1:self._stored + 1] + self._spilledLiterals).tobytes() )
+		self._spilledClauses += self._stored
+		self._spilledLiterals += used
+		self._stored = 0
+		
+	def _check(self):
+		if int(self._offsets[self._stored]) + len(self._stagedLits) >= self.spillLiterals:
+			self._spill()
+			
+	@property
+	def nClauses(self):
+		return self._spilledClauses + ClauseBuffer.nClauses.fget(self)
+		
+	@property
+	def nLiterals(self):
+		return self._spilledLiterals + ClauseBuffer.nLiterals.fget(self)
+		
+	@property
+	def spilledBytes(self):
+		return 4*self._spilledLiterals + 8*(self._spilledClauses + 1)
+		
+	def _maps(self):
+		self._spill()
+		self._litsFile.flush()
+		self._offsetsFile.flush()
+		if not self._spilledLiterals:
+			return np.empty(0, dtype=np.int32), np.zeros(self._spilledClauses + 1, dtype=np.int64)
+		return np.memmap(self.litsPath, dtype=np.int32, mode='r'), np.memmap(self.offsetsPath, dtype=np.int64, mode='r')
+		
+	@property
+	def lits(self):
+		return self._maps()[0]
+		
+	@property
+	def offsets(self):
+		return self._maps()[1]
+		
+	def append(self, clause):
+		ClauseBuffer.append(self, clause)
+		self._check()
+		
+	def appendBlock(self, block):
+		# large blocks go straight to disk in pieces that fit the in-memory part
+		block = np.asarray(block)
+		step = max(1, self.spillLiterals // max(block.shape[1], 1))
+		for start in range(0, len(block), step):
+			ClauseBuffer.appendBlock(self, block[start:start + step])
+			self._check()
+		
+	def extend(self, clauses):
+		if isinstance(clauses, ClauseBuffer):
+			offsets = clauses.offsets
+			lits = clauses.lits
+			for i in range(0, len(offsets) - 1, 1 << 16):
+				part = offsets[i:i + (1 << 16) + 1]
+				self._flush()
+				self._reserve(int(part[-1] - part[0]), len(part) - 1)
+				start = int(self._offsets[self._stored])
+				self._lits[start:start + int(part[-1] - part[0])] = lits[part[0]:part[-1]]
+				self._offsets[self._stored + 1:self._stored + len(part)] = start + (part[1:] - part[0])
+				self._stored += len(part) - 1
+				self._check()
+			return self
+		return ClauseBuffer.extend(self, clauses)
+		
+	def __getitem__(self, i):
+		lits, offsets = self._maps()
+		if i < 0:
+			i += len(offsets) - 1
+		if not 0 <= i < len(offsets) - 1:
+			raise IndexError('clause index out of range')
+		return lits[offsets[i]:offsets[i+1]].tolist()
+		
+	def close(self):
+		''' closes and deletes the spill files
+		'''
+		for f, path in ( (self._litsFile, self.litsPath), (self._offsetsFile, self.offsetsPath) ):
+			f.close()
+			if os.path.exists(path):
+				os.remove(path)
+		if self._ownDirectory and os.path.isdir(self.directory):
+			os.rmdir(self.directory)
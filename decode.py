@@ -0,0 +1,104 @@
+''' Vectorized decoding of pycosat models into grids
+
+	The variable layout of every encoding is known, so a model is turned into a truth array and
+	reshaped straight into the grid instead of going through string handles:
+
+		satoku   cell V<val>R<row> is variables (row*n**2 + val)*nBits + 1 .. + nBits and holds
+		         the column as (col // n) << nBits/2 | col % n
+		basic    cell R<row>C<col> is variables (row*n**2 + col)*nBits + 1 .. + nBits and holds
+		         the value
+		onehot   variable v(i, j, d) = n**4*(i-1) + n**2*(j-1) + d is true when cell i, j holds d,
+		         this is the layout of both sud.py and pycosatSudoku (weber)
+
+	Every decoder takes one model or a list of models and returns a numpy grid of digits 1..n**2,
+	or a (models, n**2, n**2) array for a list.  Auxiliary variables past the cells are ignored.
+'''
+import math
+import numpy as np
+
+def countBits(n, even=False):
+	''' Returns the number of bits necessary to encode the value n
+	'''
+	nBits = int (math.ceil( math.log ( n ) / math.log(2) ))
+	
+	if even  and (nBits & 1) == 1:
+		nBits += 1
+	
+	return nBits
+
+def truthTable(models, nVars):
+	''' returns a (len(models), nVars) bool array, [m, v-1] is the value of variable v in model m
+	'''
+	table = np.zeros( (len(models), nVars + 1), dtype=bool )
+	for m, model in enumerate(models):
+		model = np.asarray(model)
+		true = model[(model > 0) & (model <= nVars)]
+		table[m, true] = True
+	return table[:, 1:]
+
+def _batch(models):
+	# a single model is a flat list of ints
+	single = len(models) == 0 or np.ndim(models[0]) == 0
+	return ([models] if single else models), single
+
+def _result(grids, single):
+	return grids[0] if single else grids
+
+def packBits(bits):
+	''' packs the last axis of a bool array, least significant bit first
+	'''
+	return (bits.astype(np.int64) << np.arange(bits.shape[-1])).sum(axis=-1)
+
+def decodeSatoku(models, n):
+	''' decodes models of the satoku encoding (satokuBuffer layout)
+	'''
+	models, single = _batch(models)
+	n_sqr = n**2
+	half = countBits(n)
+	nBits = 2*half
+	bits = truthTable(models, n_sqr**2 * nBits).reshape(len(models), n_sqr, n_sqr, nBits)
+	vector = packBits(bits) # [model, row, val]
+	col = n*(vector >> half) + (vector & ((1 << half) - 1))
+	
+	grids = np.zeros( (len(models), n_sqr, n_sqr), dtype=np.int64 )
+	m, row, val = np.indices(col.shape)
+	grids[m, row, col] = val + 1
+	return _result(grids, single)
+
+def decodeBasic(models, n):
+	''' decodes models of the basic encoding (basicBuffer layout)
+	'''
+	models, single = _batch(models)
+	n_sqr = n**2
+	nBits = countBits(n_sqr)
+	bits = truthTable(models, n_sqr**2 * nBits).reshape(len(models), n_sqr, n_sqr, nBits)
+	return _result(packBits(bits) + 1, single)
+
+def decodeOneHot(models, n):
+	''' decodes models of the one-hot encoding of sud.py and pycosatSudoku, 0 for a cell with no digit
+	'''
+	models, single = _batch(models)
+	n_sqr = n**2
+	table = truthTable(models, n**6).reshape(len(models), n_sqr, n_sqr, n_sqr)
+	grids = table.argmax(axis=-1) + 1
+	grids[~table.any(axis=-1)] = 0
+	return _result(grids, single)
+
+def cellVariables(encoding, n):
+	''' number of variables holding the cells, 1..cellVariables(encoding, n), auxiliary variables
+		come after them and do not change the grid
+	'''
+	encoding = encoding.replace('-aux', '')
+	if encoding == 'satoku':
+		return n**4 * 2*countBits(n)
+	if encoding == 'basic':
+		return n**4 * countBits(n**2)
+	return n**6
+
+decoders = {'satoku': decodeSatoku, 'basic': decodeBasic, 'onehot': decodeOneHot, 'weber': decodeOneHot,
+	'satoku-aux': decodeSatoku, 'basic-aux': decodeBasic}
+
+def decode(encoding, models, n):
+	''' decodes models of the named encoding
+	'''
+	return decoders[encoding](models, n)
@@ -0,0 +1,131 @@
+''' Streaming DIMACS cnf export and import
+
+	Large instances are never held as one list.  writeDimacs() takes a stream of clause blocks,
+	either numpy arrays with one clause per row or lists of clauses, and writes them in buffered
+	chunks after a header computed ahead of time.  writeBuffer() writes a ClauseBuffer, spilled
+	to disk or not, from its arrays.  readDimacs() yields the clauses of a file back
+	one at a time, so the result can be handed straight to pycosat.solve / pycosat.itersolve.
+'''
+import numpy as np
+
+chunkSize = 1 << 20 # bytes read or clauses formatted per chunk
+
+def formatBlock(block):
+	''' returns the DIMACS text of a block of clauses
+	'''
+	if isinstance(block, np.ndarray):
+		if not len(block):
+			return ''
+		# one format operation per block instead of one per clause
+		line = ' '.join(['%d'] * block.shape[1]) + ' 0\n'
+		return (line * len(block)) % tuple(block.ravel().tolist())
+	return ''.join( ' '.join(map(str, clause)) + ' 0\n' for clause in block )
+
+def chunked(clauses, size=4096):
+	''' groups a stream of single clauses into blocks for writeDimacs()
+	'''
+	block = []
+	for clause in clauses:
+		block.append(clause)
+		if len(block) == size:
+			yield block
+			block = []
+	if block:
+		yield block
+
+def formatRun(lits, offsets):
+	''' returns the DIMACS text of clauses stored as literals and offsets (see clausebuffer.py)
+	'''
+	if len(offsets) < 2:
+		return ''
+	# a 0 after every clause, then one join for the whole run
+	ends = np.asarray(offsets[1:]) + np.arange(len(offsets) - 1)
+	words = list(map(str, np.insert(np.asarray(lits, dtype=np.int64), offsets[1:], 0).tolist()))
+	for end in ends.tolist():
+		words[end] = '0\n'
+	return ' '.join(words).replace('\n ', '\n')
+
+def writeHeader(f, nVars, nClauses, comments=()):
+	for comment in comments:
+		f.write('c %s\n' % comment)
+	f.write('p cnf %d %d\n' % (nVars, nClauses))
+
+def writeDimacs(path, blocks, nVars, nClauses, comments=()):
+	''' writes the clause blocks to path as a DIMACS cnf file, returns the number of clauses written
+	'''
+	written = 0
+	with open(path, 'w') as f:
+		writeHeader(f, nVars, nClauses, comments)
+		for block in blocks:
+			if isinstance(block, np.ndarray):
+				for start in range(0, len(block), chunkSize // 16):
+					f.write(formatBlock(block[start:start + chunkSize // 16]))
+			else:
+				f.write(formatBlock(block))
+			written += len(block)
+	if written != nClauses:
+		raise ValueError('header promised %d clauses, wrote %d' % (nClauses, written))
+	return written
+
+def writeBuffer(path, cnf, nVars=None, comments=()):
+	''' writes a ClauseBuffer or SpillBuffer to path as a DIMACS cnf file straight from its literal
+		and offset arrays, a run of clausebuffer.chunkClauses at a time, so a spilled formula is
+		never held in memory.  nVars defaults to the largest variable.  Returns the clauses written
+	'''
+	if nVars is None:
+		nVars = cnf.nVars()
+	with open(path, 'w') as f:
+		writeHeader(f, nVars, len(cnf), comments)
+		for lits, offsets in cnf.chunks():
+			f.write(formatRun(lits, offsets))
+	return len(cnf)
+
+def readHeader(path):
+	''' returns the (variable, clause) counts in the header of a DIMACS cnf file
+	'''
+	with open(path) as f:
+		for line in f:
+			if line.startswith('p'):
+				fields = line.split()
+				return int(fields[2]), int(fields[3])
+	raise ValueError('%s has no DIMACS header' % path)
+
+def parseLines(text):
+	''' returns the literals in a chunk of whole DIMACS lines, skipping comment and header lines,
+		and whether the chunk holds the '%' line that ends the clauses of SATLIB files
+	'''
+	lines = text.split('\n')
+	end = False
+	for i, line in enumerate(lines):
+		if line.lstrip().startswith('%'):
+			lines, end = lines[:i], True
+			break
+	text = '\n'.join( line for line in lines if not line.lstrip().startswith(('c', 'p')) )
+	return np.array(text.split(), dtype=np.int64), end
+
+def readDimacs(path):
+	''' yields the clauses of a DIMACS cnf file as lists of ints, up to a '%' line if there is one
+	'''
+	tail = np.empty(0, dtype=np.int64) # literals of a clause split across chunks
+	rest = '' # text of a line split across chunks
+	with open(path) as f:
+		while True:
+			data = f.read(chunkSize)
+			text = rest + data
+			if data:
+				cut = text.rfind('\n') + 1
+				text, rest = text[:cut], text[cut:]
+			parsed, last = parseLines(text)
+			lits = np.concatenate( (tail, parsed) )
+			
+			start = 0
+			values = lits.tolist()
+			for end in np.flatnonzero(lits == 0).tolist():
+				yield values[start:end]
+				start = end + 1
+			tail = lits[start:]
+			if not data or last:
+				break
+	if len(tail):
+		# a final clause without its terminating 0
+		yield tail.tolist()
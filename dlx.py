@@ -0,0 +1,252 @@
+''' Exact cover (Algorithm X with dancing links) backend for the standard sudoku constraints
+
+	A sudoku of order n is an exact cover problem with one row per (row, col, val) candidate and
+	4*n**4 columns: every cell holds one value, and every row, column and box holds every value
+	once.  The links live in parallel integer lists indexed by node (node 0 is the root, nodes
+	1..nColumns the column headers, then four nodes per candidate) instead of node objects, and
+	are built in one go with numpy.  The search always branches on the column with the fewest
+	candidates and keeps an explicit stack instead of recursing.
+'''
+import numpy as np
+
+import symbreak
+
+class ExactCover(object):
+	''' exact cover problem over nColumns columns, rows is a (nRows, width) array of 0 based
+		column numbers, every row covering the same number of columns
+	'''
+	def __init__(self, nColumns, rows):
+		rows = np.asarray(rows, dtype=np.int64)
+		nRows, width = rows.shape
+		nNodes = nColumns + 1 + rows.size
+		self.nColumns = nColumns
+		self.nRows = nRows
+		self.width = width
+
+		node = np.arange(nColumns + 1, nNodes).reshape(nRows, width)
+		col = np.empty(nNodes, dtype=np.int64)
+		col[:nColumns + 1] = np.arange(nColumns + 1)
+		col[node] = rows + 1
+
+		# headers form a ring through the root, the nodes of a row a ring of their own
+		left = np.empty(nNodes, dtype=np.int64)
+		right = np.empty(nNodes, dtype=np.int64)
+		left[:nColumns + 1] = np.roll(np.arange(nColumns + 1), 1)
+		right[:nColumns + 1] = np.roll(np.arange(nColumns + 1), -1)
+		left[node] = np.roll(node, 1, axis=1)
+		right[node] = np.roll(node, -1, axis=1)
+
+		# each column is a ring of its header and its nodes in row order
+		up = np.empty(nNodes, dtype=np.int64)
+		down = np.empty(nNodes, dtype=np.int64)
+		# headers have the lowest node number of their column, so sorting puts them first
+		ids = np.arange(1, nNodes)
+		ring = ids[np.lexsort( (ids, col[ids]) )]
+		starts = np.searchsorted(col[ring], np.arange(1, nColumns + 2))
+		nxt = np.roll(ring, -1)
+		prv = np.roll(ring, 1)
+		last = starts[1:] - 1
+		nxt[last] = ring[starts[:-1]]
+		prv[starts[:-1]] = ring[last]
+		down[ring] = nxt
+		up[ring] = prv
+		up[0] = down[0] = 0
+
+		size = np.zeros(nColumns + 1, dtype=np.int64)
+		size[1:] = np.bincount(rows.ravel(), minlength=nColumns)
+
+		self.L, self.R, self.U, self.D, self.C = left.tolist(), right.tolist(), up.tolist(), down.tolist(), col.tolist()
+		self.S = size.tolist()
+		self.selected = []
+
+	def rowOf(self, node):
+		return (node - self.nColumns - 1) // self.width
+
+	def cover(self, c):
+		L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+		R[L[c]] = R[c]
+		L[R[c]] = L[c]
+		i = D[c]
+		while i != c:
+			j = R[i]
+			while j != i:
+				D[U[j]] = D[j]
+				U[D[j]] = U[j]
+				S[C[j]] -= 1
+				j = R[j]
+			i = D[i]
+
+	def uncover(self, c):
+		L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+		i = U[c]
+		while i != c:
+			j = L[i]
+			while j != i:
+				S[C[j]] += 1
+				D[U[j]] = j
+				U[D[j]] = j
+				j = L[j]
+			i = U[i]
+		R[L[c]] = c
+		L[R[c]] = c
+
+	def _coverRow(self, r):
+		# covers the other columns of the row of node r, its own column is already covered
+		j = self.R[r]
+		while j != r:
+			self.cover(self.C[j])
+			j = self.R[j]
+
+	def _uncoverRow(self, r):
+		j = self.L[r]
+		while j != r:
+			self.uncover(self.C[j])
+			j = self.L[j]
+
+	def select(self, row):
+		''' fixes row in the solution before searching, returns False if one of its columns
+			is already covered by a selected row
+		'''
+		first = self.nColumns + 1 + row*self.width
+		nodes = range(first, first + self.width)
+		if any( self.R[self.L[self.C[j]]] != self.C[j] for j in nodes ):
+			return False
+		for j in nodes:
+			self.cover(self.C[j])
+		self.selected.append(row)
+		return True
+
+	def deselect(self):
+		''' undoes the last select, selections are undone in the reverse order they were made
+		'''
+		row = self.selected.pop()
+		first = self.nColumns + 1 + row*self.width
+		for j in reversed(range(first, first + self.width)):
+			self.uncover(self.C[j])
+
+	def hide(self, row):
+		''' takes row out of its columns so no solution uses it, undone by unhide in the reverse
+			order of the selects and hides that followed
+		'''
+		U, D, C, S = self.U, self.D, self.C, self.S
+		first = self.nColumns + 1 + row*self.width
+		for j in range(first, first + self.width):
+			D[U[j]] = D[j]
+			U[D[j]] = U[j]
+			S[C[j]] -= 1
+
+	def unhide(self, row):
+		U, D, C, S = self.U, self.D, self.C, self.S
+		first = self.nColumns + 1 + row*self.width
+		for j in reversed(range(first, first + self.width)):
+			S[C[j]] += 1
+			D[U[j]] = j
+			U[D[j]] = j
+
+	def _choose(self):
+		# the column with the fewest rows left, 0 when every column is covered
+		R, S = self.R, self.S
+		best, bestSize = 0, None
+		c = R[0]
+		while c != 0:
+			if bestSize is None or S[c] < bestSize:
+				best, bestSize = c, S[c]
+				if bestSize <= 1:
+					break
+			c = R[c]
+		return best
+
+	def search(self, limit=1):
+		''' returns up to limit solutions, each a sorted list of row numbers including the
+			selected rows, the links are restored afterwards
+		'''
+		solutions = []
+		stack = []
+		c = self._choose()
+		while True:
+			if c == 0:
+				solutions.append( sorted(self.selected + [ self.rowOf(r) for r in stack ]) )
+				descend = False
+			elif self.S[c] == 0:
+				descend = False
+			else:
+				self.cover(c)
+				r = self.D[c]
+				self._coverRow(r)
+				stack.append(r)
+				descend = True
+
+			if descend and (limit is None or len(solutions) < limit):
+				c = self._choose()
+				continue
+
+			# backtrack to the next row of the deepest column with one left
+			while stack and (limit is None or len(solutions) < limit):
+				r = stack.pop()
+				self._uncoverRow(r)
+				c = self.C[r]
+				r = self.D[r]
+				if r != c:
+					self._coverRow(r)
+					stack.append(r)
+					break
+				self.uncover(c)
+			else:
+				break
+			c = self._choose()
+
+		# unwind whatever the limit cut short
+		while stack:
+			r = stack.pop()
+			self._uncoverRow(r)
+			self.uncover(self.C[r])
+		return solutions
+
+def sudokuRows(n):
+	''' returns the (n**6, 4) columns of every candidate, candidate (row*n**2 + col)*n**2 + val
+	'''
+	n_sqr = n**2
+	row, col, val = np.indices( (n_sqr, n_sqr, n_sqr) ).reshape(3, -1)
+	box = (row // n)*n + col // n
+	return np.stack( (row*n_sqr + col,
+		n_sqr**2 + row*n_sqr + val,
+		2*n_sqr**2 + col*n_sqr + val,
+		3*n_sqr**2 + box*n_sqr + val), axis=1 )
+
+def candidate(n, row, col, val):
+	return (row*n**2 + col)*n**2 + val
+
+def sudokuCover(grid, symmetry=False):
+	''' returns the ExactCover of a grid with its givens selected, or None if they clash,
+		symmetry pins the first row and column when the grid is blank (see symbreak.py)
+	'''
+	n = int(round(len(grid)**0.5))
+	cover = ExactCover(4*n**4, sudokuRows(n))
+	cells = [ (r, c, val - 1) for r, row in enumerate(grid) for c, val in enumerate(row) if val ]
+	if symmetry and not cells:
+		cells = symbreak.pins(n)
+	for r, c, val in cells:
+		if not cover.select(candidate(n, r, c, val)):
+			return None
+	return cover
+
+def readSolution(n, rows):
+	''' returns the grid of a solution's candidate rows, values 1..n**2
+	'''
+	n_sqr = n**2
+	grid = [ [0]*n_sqr for r in range(n_sqr) ]
+	for row in rows:
+		cell, val = divmod(row, n_sqr)
+		grid[cell // n_sqr][cell % n_sqr] = val + 1
+	return grid
+
+def solveGrid(grid, symmetry=False):
+	''' returns a solved copy of a grid of any order, or None if it has no solution
+	'''
+	cover = sudokuCover(grid, symmetry)
+	if cover is None:
+		return None
+	solutions = cover.search(1)
+	if not solutions:
+		return None
+	return readSolution(int(round(len(grid)**0.5)), solutions[0])
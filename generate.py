@@ -0,0 +1,169 @@
+''' Puzzle generator
+
+	A full grid is found by solving a blank grid whose first row is a random permutation, and is
+	then shuffled with random validity preserving symmetries (relabeling the digits, permuting
+	rows within a band, bands, columns within a stack, stacks, and transposing).  Clues are then
+	removed in random order, a removal is kept only while the puzzle stays unique, until the
+	target number of clues is reached or no clue can go.  Uniqueness is checked on one reused
+	exact cover of dlx.py by default, or with solutions.countSolutions on a SAT encoding.
+
+	python generate.py --count 1000 --order 3 --clues 28 --workers 4 > puzzles.txt
+'''
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import random
+import sys
+
+import bench
+import dlx
+import pycosatSudoku
+import registry
+import solutions
+
+def shuffleGrid(grid, rng):
+	''' returns a copy of a valid grid under random symmetries, which is valid as well
+	'''
+	n = bench.orderOf(grid)
+	n_sqr = n**2
+
+	def order():
+		# bands (or stacks) in random order, and the lines within each in random order
+		bands = rng.sample(range(n), n)
+		return [ b*n + i for b in bands for i in rng.sample(range(n), n) ]
+
+	digits = [0] + rng.sample(range(1, n_sqr + 1), n_sqr)
+	rows, cols = order(), order()
+	out = [ [ digits[grid[r][c]] for c in cols ] for r in rows ]
+	if rng.random() < 0.5:
+		out = [ list(col) for col in zip(*out) ]
+	return out
+
+def fullGrid(n, rng, backend='dlx'):
+	''' returns a random full grid of order n
+	'''
+	n_sqr = n**2
+	grid = bench.blankGrid(n)
+	grid[0] = rng.sample(range(1, n_sqr + 1), n_sqr)
+	solved = pycosatSudoku.backends[backend](grid)
+	return shuffleGrid(solved, rng)
+
+def otherSolution(cover, puzzle, r, c, val):
+	''' True when puzzle, unique with val at (r, c), has another solution without that clue
+
+		any other solution differs at (r, c), so the clues but that one are selected on cover,
+		the exact cover of a blank grid, with the candidate of val at (r, c) hidden and one
+		solution is looked for.  Everything is undone afterwards for the next cell.
+	'''
+	n = bench.orderOf(puzzle)
+	selected = 0
+	for i, row in enumerate(puzzle):
+		for j, given in enumerate(row):
+			if given and (i, j) != (r, c):
+				cover.select(dlx.candidate(n, i, j, given - 1))
+				selected += 1
+	hidden = dlx.candidate(n, r, c, val - 1)
+	cover.hide(hidden)
+	found = bool(cover.search(1))
+	cover.unhide(hidden)
+	for i in range(selected):
+		cover.deselect()
+	return found
+
+def removeClues(solution, rng, target=0, encoding='dlx'):
+	''' returns a unique puzzle of solution with as few clues as target allows
+
+		cells are tried in random order and each is removed unless the puzzle would gain a
+		second solution, stopping once only target clues are left.  On dlx one exact cover is
+		reused for every cell (see otherSolution), the SAT encodings count the solutions of each
+		smaller puzzle from scratch as pycosat keeps nothing between calls
+	'''
+	puzzle = [ row[:] for row in solution ]
+	n_sqr = len(solution)
+	n = bench.orderOf(solution)
+	clues = n_sqr**2
+	cells = [ (r, c) for r in range(n_sqr) for c in range(n_sqr) ]
+	rng.shuffle(cells)
+	cover = dlx.ExactCover(4*n**4, dlx.sudokuRows(n)) if encoding == 'dlx' else None
+	for r, c in cells:
+		if clues <= target:
+			break
+		if cover is not None:
+			unique = not otherSolution(cover, puzzle, r, c, solution[r][c])
+			puzzle[r][c] = 0
+		else:
+			puzzle[r][c] = 0
+			unique = solutions.countSolutions(puzzle, 2, encoding) == 1
+		if unique:
+			clues -= 1
+		else:
+			puzzle[r][c] = solution[r][c]
+	return puzzle
+
+def clueCount(grid):
+	return sum( 1 for row in grid for val in row if val )
+
+def generate(n=3, target=0, seed=None, attempts=1, encoding='dlx'):
+	''' returns (puzzle, solution) of a new unique order n puzzle
+
+		with a target the puzzle is regenerated from a fresh grid up to attempts times until
+		it has at most target clues, the puzzle with the fewest clues is returned
+	'''
+	rng = random.Random(seed)
+	best = None
+	for i in range(max(attempts, 1)):
+		solution = fullGrid(n, rng)
+		puzzle = removeClues(solution, rng, target, encoding)
+		if best is None or clueCount(puzzle) < clueCount(best[0]):
+			best = (puzzle, solution)
+		if clueCount(puzzle) <= target:
+			break
+	return best
+
+def _generate(args):
+	return generate(*args)
+
+def generateMany(count, n=3, target=0, seed=None, workers=None, attempts=1, encoding='dlx', chunksize=4):
+	''' generates count puzzles on a pool of worker processes, yielding (puzzle, solution) pairs
+		as they complete
+
+		puzzle i is generated from seed + i, so a run with a seed can be repeated
+	'''
+	if seed is None:
+		seed = random.randrange(1 << 30)
+	jobs = ( (n, target, seed + i, attempts, encoding) for i in range(count) )
+	if workers == 1:
+		for job in jobs:
+			yield _generate(job)
+		return
+	pool = multiprocessing.Pool(workers)
+	try:
+		for item in pool.imap_unordered(_generate, jobs, chunksize):
+			yield item
+		pool.close()
+	finally:
+		pool.terminate()
+		pool.join()
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='generate unique sudoku puzzles, one per line')
+	parser.add_argument('--count', type=int, default=10)
+	parser.add_argument('--order', type=int, default=3)
+	parser.add_argument('--clues', type=int, default=0, help='stop removing clues at this many')
+	parser.add_argument('--attempts', type=int, default=1, help='fresh grids to try for the clue target')
+	parser.add_argument('--seed', type=int)
+	parser.add_argument('--workers', type=int, help='worker processes, defaults to the number of CPUs')
+	parser.add_argument('--encoding', default='dlx', choices=sorted(registry.encodings), help='uniqueness checker')
+	parser.add_argument('--solutions', action='store_true', help='append the solution to each line')
+	args = parser.parse_args(argv)
+
+	for puzzle, solution in generateMany(args.count, args.order, args.clues, args.seed, args.workers, args.attempts, args.encoding):
+		line = bench.formatPuzzle(puzzle)
+		if args.solutions:
+			line += ' ' + bench.formatPuzzle(solution)
+		print(line)
+	sys.stdout.flush()
+
+if __name__ == '__main__':
+	main()
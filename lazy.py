@@ -0,0 +1,140 @@
+''' Counterexample guided solving with lazily added constraints
+
+	Only the row and null value constraints (and the givens) of the satoku or basic encoding are
+	given to pycosat at first.  Each model is decoded and checked, and the not equal clauses of
+	just the column / box pairs it violates are added before solving again, until a model is a
+	valid grid or the formula is unsatisfiable.  Most pairs of a large grid never conflict, so
+	the final formula is usually a small part of the full one (satoku.sizeFunctions).
+
+	The pairs and clauses are those of the satoku.satokuSector / basicSector blocks, with the
+	auxiliary variables of the 'auxiliary' encoding numbered as they are added.
+
+	stats = {}
+	solved = solveGrid(grid, 'satoku', stats=stats)   # stats['rounds'], stats['clauses'], ...
+'''
+import numpy as np
+import pycosat
+
+import decode
+import satoku
+
+def initialClauses(n, model='satoku', encoding='exponential', grid=None, symmetry=False):
+	''' returns (clauses, next free variable) of the row, null value and given constraints,
+		symmetry pins the first row and column of a blank grid instead (see symbreak.py)
+	'''
+	sector = satoku.sectorFunctions[model][0]
+	clauses = []
+	nextVar = None
+	for phase in ('row', 'null value'):
+		for index in range(n**2):
+			blocks, nextVar = sector(n, phase, index, encoding, nextVar)
+			for block in blocks:
+				clauses.extend(block.tolist())
+	clauses.extend( [l] for l in satoku.unitLiterals(n, model, grid, symmetry) )
+	return clauses, nextVar
+
+def linePairs(n_sqr):
+	''' returns the pairs i < j of range(n_sqr) as two arrays
+	'''
+	return np.triu_indices(n_sqr, 1)
+
+def satokuConflicts(n, solved):
+	''' returns the (phase, sectors, cellsA, cellsB, startBit) pair groups of the satoku column
+		constraints a grid (values 1..n**2) violates, sectors[k] is the satoku.satokuSector index
+		of pair k and a cell is row*n**2 + val as in satoku.iterSatokuPhases
+	'''
+	G = np.asarray(solved)
+	n_sqr = n**2
+	half = satoku.countBits(n)
+	rows = np.arange(n_sqr)[:, None]
+	# col[row, val] is the column of val in row, what the satoku cell bits hold
+	col = np.empty( (n_sqr, n_sqr), dtype=np.int64 )
+	col[rows, G - 1] = np.arange(n_sqr)
+	i, j = linePairs(n_sqr)
+	band = ((i // n) == (j // n))[:, None]
+	# rows of a band must differ in the stack (upper bits), other rows in the column
+	boxes = band & ((col[i] // n) == (col[j] // n))
+	columns = ~band & (col[i] == col[j])
+	out = []
+	for clash, startBit in ( (boxes, half), (columns, 0) ):
+		pair, val = np.nonzero(clash)
+		if len(pair):
+			out.append( ('column', val, i[pair]*n_sqr + val, j[pair]*n_sqr + val, startBit) )
+	return out
+
+def basicConflicts(n, solved):
+	''' returns the (phase, sectors, cellsA, cellsB, startBit) pair groups of the basic column and
+		group constraints a grid (values 1..n**2) violates, sectors[k] is the satoku.basicSector
+		index of pair k and a cell is row*n**2 + col
+	'''
+	G = np.asarray(solved).ravel()
+	n_sqr = n**2
+	cells = np.arange(n_sqr**2).reshape(n_sqr, n_sqr)
+	groups = cells.reshape(n, n, n, n).transpose(0, 2, 1, 3).reshape(n_sqr, n_sqr)
+	i, j = linePairs(n_sqr)
+	keep = ((i // n) != (j // n)) & ((i % n) != (j % n))
+	out = []
+	for phase, A, B in ( ('column', cells[i].T, cells[j].T), ('group', groups[:, i[keep]], groups[:, j[keep]]) ):
+		clash = G[A] == G[B]
+		if clash.any():
+			sector = np.nonzero(clash)[0]
+			out.append( (phase, sector, A[clash], B[clash], 0) )
+	return out
+
+conflictFunctions = {'satoku': satokuConflicts, 'basic': basicConflicts}
+cellBits = {'satoku': lambda n: 2*satoku.countBits(n), 'basic': lambda n: satoku.countBits(n**2)}
+
+def lazySolve(grid, model='satoku', encoding='exponential', granularity='pair', maxRounds=None, stats=None, symmetry=False):
+	''' returns a solved copy of a puzzle (0 for blank, values 1..n**2) or None when it has none
+
+		granularity 'pair' adds the clauses of the violated pairs only, 'sector' those of every
+		pair of a column / box with a violation, fewer and easier solves for more clauses.
+		maxRounds bounds the solves, None is returned when they run out.  stats, a dict, gets
+		the rounds, the clauses and conflicting pairs added and the clauses of the final formula
+		next to those of the full one, both counting the unit clauses of the givens.  symmetry
+		pins the first row and column when the grid is blank
+	'''
+	n = int(round(len(grid)**0.5))
+	nBits = cellBits[model](n)
+	sector = satoku.sectorFunctions[model][0]
+	clauses, nextVar = initialClauses(n, model, encoding, grid, symmetry)
+	initial = len(clauses)
+	pairs = rounds = 0
+	added = set() # (phase, index) of the sectors added whole
+	solved = None
+	while maxRounds is None or rounds < maxRounds:
+		rounds += 1
+		sol = pycosat.solve(clauses)
+		if sol == 'UNSAT':
+			break
+		candidate = decode.decode(model, sol, n)
+		conflicts = conflictFunctions[model](n, candidate)
+		if not conflicts:
+			solved = candidate.tolist()
+			break
+		for phase, sectors, A, B, startBit in conflicts:
+			pairs += len(A)
+			if granularity == 'pair':
+				blocks, nextVar = satoku.notEqualBlocks(A, B, nBits, startBit, encoding, nextVar)
+			else:
+				blocks = []
+				for index in sorted(set(sectors.tolist())):
+					if (phase, index) not in added:
+						added.add( (phase, index) )
+						more, nextVar = sector(n, phase, index, encoding, nextVar)
+						blocks.extend(more)
+			for block in blocks:
+				clauses.extend(block.tolist())
+	if stats is not None:
+		stats.update({
+			'rounds': rounds, 'pairs': pairs,
+			'initialClauses': initial, 'addedClauses': len(clauses) - initial,
+			'clauses': len(clauses),
+			'fullClauses': satoku.sizeFunctions[model](n, encoding)[1] + len(satoku.unitLiterals(n, model, grid, symmetry)),
+		})
+	return solved
+
+def solveGrid(grid, model='satoku', encoding='exponential', granularity='pair', symmetry=False):
+	''' solveGrid with the conventions of satoku.solveGrid
+	'''
+	return lazySolve(grid, model, encoding, granularity, symmetry=symmetry)
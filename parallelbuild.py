@@ -0,0 +1,130 @@
+''' Parallel construction of the satoku and basic encodings
+
+	The row, column, group and null value constraints of each row / column / box are sectors
+	that only share the numbering of the auxiliary variables (see satoku.satokuSector), and the
+	size of every sector is known before it is built.  parallelBuffer lays the sectors out in
+	one literal array and one offset array in shared memory, with the place and the first
+	auxiliary variable of each sector worked out in advance, and a pool of worker processes
+	writes the sectors straight into place.  The arrays are then wrapped as a ClauseBuffer
+	without copying, holding the clauses of satoku.builderFunctions in the same order.
+
+	The arrays are files in sharedDir, /dev/shm when there is one, which are unlinked once the
+	build is done so the memory goes away with the buffer.
+
+	cnf = parallelBuffer(6, 'satoku', workers=32)
+'''
+import multiprocessing
+import os
+import shutil
+import tempfile
+import numpy as np
+
+import satoku
+
+from clausebuffer import ClauseBuffer
+
+# directory of the shared arrays, None for the system temporary directory
+sharedDir = os.environ.get('SATOKU_SHARED_DIR') or ('/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+_maps = {} # (pid, path) -> memmap, a pool worker opens each array once
+
+def shardPlan(n, model='satoku', encoding='exponential', symmetry=False, grid=None):
+	''' returns the shards of a formula in build order and its clause and literal totals
+
+		a shard is (phase, index, first auxiliary variable, first literal, first clause), with
+		index None for the unit clauses of satoku.unitLiterals, which go before the null values
+	'''
+	sizes = satoku.sectorFunctions[model][1]
+	n_sqr = n**2
+	# the exponential encoding has no auxiliary variables, so its variables are the cell bits
+	nextVar = satoku.sizeFunctions[model](n, 'exponential')[0] + 1
+	units = len(satoku.unitLiterals(n, model, grid, symmetry))
+
+	shards = []
+	literals = clauses = 0
+	for phase in satoku.sectorPhases[model]:
+		if phase == 'null value' and units:
+			shards.append( ('units', None, nextVar, literals, clauses) )
+			literals += units
+			clauses += units
+		aux, c, l = sizes(n, phase, encoding)
+		if not c:
+			continue
+		for index in range(n_sqr):
+			shards.append( (phase, index, nextVar, literals, clauses) )
+			nextVar += aux
+			literals += l
+			clauses += c
+	return shards, clauses, literals
+
+def _open(path, dtype):
+	key = (os.getpid(), path)
+	if key not in _maps:
+		_maps[key] = np.memmap(path, dtype=dtype, mode='r+')
+	return _maps[key]
+
+def writeShard(lits, offsets, blocks, literal, clause):
+	''' writes clause blocks into lits / offsets from the given first literal and clause
+	'''
+	for block in blocks:
+		rows, width = block.shape
+		lits[literal:literal + rows*width] = block.ravel()
+		offsets[clause + 1:clause + rows + 1] = literal + width*np.arange(1, rows + 1)
+		literal += rows*width
+		clause += rows
+
+def buildShards(n, model, encoding, lits, offsets, shards):
+	''' builds a run of shards of one formula into lits / offsets
+	'''
+	sector = satoku.sectorFunctions[model][0]
+	for phase, index, nextVar, literal, clause in shards:
+		blocks, nextVar = sector(n, phase, index, encoding, nextVar)
+		writeShard(lits, offsets, blocks, literal, clause)
+
+def _buildShards(job):
+	# the pool side of buildShards, on the shared arrays by path
+	n, model, encoding, litsPath, offsetsPath, shards = job
+	lits = _open(litsPath, np.int32)
+	offsets = _open(offsetsPath, np.int64)
+	buildShards(n, model, encoding, lits, offsets, shards)
+	lits.flush()
+	offsets.flush()
+
+def parallelBuffer(n, model='satoku', encoding='exponential', symmetry=False, workers=None, directory=None, chunksize=1, grid=None):
+	''' builds the formula of satoku.builderFunctions[model] on a pool of worker processes (all
+		CPUs by default) into shared arrays in directory (sharedDir by default), returned as a
+		ClauseBuffer over them
+	'''
+	shards, clauses, literals = shardPlan(n, model, encoding, symmetry, grid)
+	folder = tempfile.mkdtemp(prefix='satoku-', dir=directory or sharedDir)
+	try:
+		litsPath = os.path.join(folder, 'lits')
+		offsetsPath = os.path.join(folder, 'offsets')
+		lits = np.memmap(litsPath, dtype=np.int32, mode='w+', shape=(max(literals, 1),))
+		offsets = np.memmap(offsetsPath, dtype=np.int64, mode='w+', shape=(clauses + 1,))
+		offsets[0] = 0
+
+		jobs = []
+		for shard in shards:
+			if shard[1] is None:
+				units = np.array(satoku.unitLiterals(n, model, grid, symmetry), dtype=np.int32).reshape(-1, 1)
+				writeShard(lits, offsets, [units], shard[3], shard[4])
+			else:
+				jobs.append( (n, model, encoding, litsPath, offsetsPath, [shard]) )
+		if workers == 1:
+			# the parent writes through its own maps, only the pool workers go through _open
+			for job in jobs:
+				buildShards(n, model, encoding, lits, offsets, job[5])
+		else:
+			pool = multiprocessing.Pool(workers)
+			try:
+				for done in pool.imap_unordered(_buildShards, jobs, chunksize):
+					pass
+				pool.close()
+			finally:
+				pool.terminate()
+				pool.join()
+	finally:
+		# the maps stay valid after unlinking, where the system allows it
+		shutil.rmtree(folder, ignore_errors=True)
+	return ClauseBuffer.fromArrays(lits[:literals], offsets)
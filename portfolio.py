@@ -0,0 +1,106 @@
+''' Portfolio solving: race several encodings of one grid in separate processes
+
+	Each encoding is built, solved and decoded in its own process with the builders and decoders
+	of registry.py, the first answer is returned and the other processes are terminated.  The
+	winners are tallied in wins so the best encoding per order can be read off after a run.
+
+	grid, winner, seconds = race(grid, ('satoku', 'basic', 'onehot', 'weber'))
+
+	The race starts processes of its own, so it runs in the calling process and cannot run in
+	the daemonic workers of a multiprocessing.Pool (see pycosatSudoku.solve_many).
+'''
+from __future__ import print_function
+
+import multiprocessing
+
+try:
+	import queue
+except ImportError:
+	import Queue as queue
+
+import registry
+import symbreak
+
+from buildstats import clock
+from registry import supported, isSolution
+
+defaultEncodings = ('satoku', 'basic', 'onehot', 'weber')
+
+# (n, encoding) -> number of races won
+wins = {}
+
+def _run(encoding, grid, results):
+	try:
+		solved = registry.solve(encoding, grid)
+		# an encoding with a bug must not win the race
+		if solved is not None and not isSolution(solved, grid):
+			raise ValueError('decoded grid is not a solution')
+		results.put( (encoding, solved, None) )
+	except Exception as e:
+		results.put( (encoding, None, repr(e)) )
+
+def race(grid, encodings=defaultEncodings, timeout=None, symmetry=False):
+	''' solves grid with every encoding at once and returns (grid, winner, seconds)
+
+		grid is None when it has no solution, and winner is None as well when no encoding
+		answered within timeout seconds.  symmetry fills in the pins of symbreak.py when the
+		grid is blank.  Encodings that fail, or decode to an invalid grid, are skipped as long
+		as another one answers.
+	'''
+	start = clock()
+	n = registry.orderOf(grid)
+	if symmetry and symbreak.isBlank(grid):
+		grid = [ row[:] for row in grid ]
+		for r, c, val in symbreak.pins(n):
+			grid[r][c] = val + 1
+	encodings = supported(encodings, n)
+	if not encodings:
+		raise ValueError('no encoding supports order %d' % n)
+
+	results = multiprocessing.Queue()
+	workers = [ multiprocessing.Process(target=_run, args=(e, grid, results)) for e in encodings ]
+	for p in workers:
+		p.daemon = True
+		p.start()
+
+	winner = solved = None
+	errors = []
+	try:
+		while len(errors) < len(workers):
+			left = None if timeout is None else timeout - (clock() - start)
+			if left is not None and left <= 0:
+				break
+			try:
+				encoding, solved, error = results.get(timeout=left)
+			except queue.Empty:
+				break
+			if error is None:
+				winner = encoding
+				break
+			errors.append( (encoding, error) )
+	finally:
+		for p in workers:
+			if p.is_alive():
+				p.terminate()
+		for p in workers:
+			p.join()
+
+	if winner is None and len(errors) == len(workers):
+		raise RuntimeError('every encoding failed: %s' % errors)
+	if winner is not None:
+		wins[n, winner] = wins.get( (n, winner), 0 ) + 1
+	return solved, winner, clock() - start
+
+def solveGrid(grid, symmetry=False):
+	''' returns a solved copy of grid from the default portfolio, or None
+	'''
+	return race(grid, symmetry=symmetry)[0]
+
+if __name__ == '__main__':
+	import bench
+	
+	for n in (2, 3, 4):
+		for i in range(3):
+			solved, winner, t = race(bench.blankGrid(n), symmetry=True)
+			print(n, winner, '%.4f' % t)
+	print(wins)
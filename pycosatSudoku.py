@@ -7,8 +7,19 @@ which calculates the 324 clauses corresponding to 9 cells, you are strongly
 encouraged to read the paper first.  The paper is very short, but contains
 all necessary information.
 """
+from __future__ import print_function
+
+import multiprocessing
 import pycosat
-import time
+
+import decode
+import dlx
+import simplify
+import solutioncache
+import symbreak
+import templates
+
+from buildstats import clock
 
 
 def v(i, j, d):
@@ -19,13 +30,16 @@ def v(i, j, d):
     return 81 * (i - 1) + 9 * (j - 1) + d
 
 
-def sudoku_clauses():
+def sudoku_clauses(res=None):
     """
     Create the (11745) Sudoku clauses, and return them as a list.
     Note that these clauses are *independent* of the particular
-    Sudoku puzzle at hand.
+    Sudoku puzzle at hand.  When res (a list or ClauseBuffer) is given
+    the clauses are appended to it instead.
     """
-    res = []
+    if res is None:
+        res = []
+    start = len(res)
     # for all cells, ensure that the each cell:
     for i in range(1, 10):
         for j in range(1, 10):
@@ -55,42 +69,214 @@ def sudoku_clauses():
         for j in 1, 4 ,7:
             valid([(i + k % 3, j + k // 3) for k in range(9)])
 
-    assert len(res) == 81 * (1 + 36) + 27 * 324
+    assert len(res) - start == 81 * (1 + 36) + 27 * 324
     return res
 
 
-def solve(grid):
+def template_clauses(n):
+    # builder for the template cache, these clauses only exist for 9x9 grids
+    assert n == 3
+    return sudoku_clauses()
+
+templates.register('weber', template_clauses)
+
+
+def given_literals(grid):
     """
-    solve a Sudoku grid inplace
+    return the literals of the digits already known in a Sudoku grid
     """
-    clauses = sudoku_clauses()
-    for i in range(1, 10):
-        for j in range(1, 10):
-            d = grid[i - 1][j - 1]
-            # For each digit already known, a clause (with one literal).
-            # Note:
-            #     We could also remove all variables for the known cells
-            #     altogether (which would be more efficient).  However, for
-            #     the sake of simplicity, we decided not to do that.
-            if d:
-                clauses.append([v(i, j, d)])
-
-    # solve the SAT problem
-	
-    start = time.clock()
-    sol = set(pycosat.solve(clauses))
-    t =  time.clock() - start
-    print 'pycosat	clauses:', len(clauses), '	solution time:', t
-
-    def read_cell(i, j):
-        # return the digit of cell i, j according to the solution
-        for d in range(1, 10):
-            if v(i, j, d) in sol:
-                return d
+    return [v(i, j, grid[i - 1][j - 1])
+            for i in range(1, 10) for j in range(1, 10) if grid[i - 1][j - 1]]
 
-    for i in range(1, 10):
-        for j in range(1, 10):
-            grid[i - 1][j - 1] = read_cell(i, j)
+
+def symmetry_literals():
+    """
+    return the literals pinning the first row and column of a blank grid,
+    see symbreak.py
+    """
+    return [v(i + 1, j + 1, d + 1) for i, j, d in symbreak.pins(3)]
+
+
+_index = [None, None]
+
+
+def reduced_clauses(grid, symmetry=False):
+    """
+    return the base clauses with the givens of a Sudoku grid eliminated,
+    as (clauses, names, value) from simplify.reduceCNF, or None if the
+    givens contradict each other.  With symmetry the first row and column
+    of a blank grid are pinned as well (ignored when there are givens).
+    """
+    clauses = templates.getTemplate('weber', 3)
+    # the index of the base clauses is shared between puzzles too
+    if _index[0] is not clauses:
+        _index[:] = [clauses, simplify.buildIndex(clauses)]
+    units = given_literals(grid)
+    if symmetry and not units:
+        units = symmetry_literals()
+    return simplify.reduceCNF(clauses, units, _index[1])
+
+
+def solve_reduced(grid, symmetry=False):
+    """
+    solve the reduced formula of a Sudoku grid, return the model over the
+    original variables or 'UNSAT', and the number of clauses solved
+    """
+    reduced = reduced_clauses(grid, symmetry)
+    if reduced is None:
+        return 'UNSAT', 0
+    clauses, names, value = reduced
+    sol = pycosat.solve(clauses)
+    if sol == 'UNSAT':
+        return sol, len(clauses)
+    return simplify.expandModel(sol, names, value), len(clauses)
+
+
+def read_grid(sol):
+    """
+    return the grid encoded by a pycosat solution
+    """
+    # see decode.py, cells without a digit read as None
+    grid = decode.decodeOneHot(sol, 3).tolist()
+    return [[d or None for d in row] for row in grid]
+
+
+def solve_grid_pycosat(grid, symmetry=False):
+    """
+    return a solved copy of a Sudoku grid, or None if it has no solution
+    """
+    sol = solve_reduced(grid, symmetry)[0]
+    if sol == 'UNSAT':
+        return None
+    return read_grid(sol)
+
+
+def solve_grid_satoku(grid, symmetry=False):
+    # the value indexed binary encoding of satoku.py, imported here as it
+    # imports this module
+    import satoku
+    return satoku.solveGrid(grid, 'satoku', symmetry=symmetry)
+
+
+def solve_grid_lazy(grid, symmetry=False):
+    # satoku clauses added as the models violate them, see lazy.py
+    import lazy
+    return lazy.solveGrid(grid, 'satoku', symmetry=symmetry)
+
+
+def solve_grid_portfolio(grid, symmetry=False):
+    # imported here, portfolio.py builds on registry.py which imports this module
+    import portfolio
+    return portfolio.solveGrid(grid, symmetry)
+
+
+# name -> solve_grid(grid, symmetry), see dlx.py for the exact cover search,
+# lazy.py for the lazily built satoku clauses and portfolio.py for racing
+# the encodings
+backends = {
+    'pycosat': solve_grid_pycosat,
+    'dlx': dlx.solveGrid,
+    'satoku': solve_grid_satoku,
+    'lazy': solve_grid_lazy,
+    'portfolio': solve_grid_portfolio,
+}
+
+
+def solve(grid, symmetry=False, backend='pycosat', cached=False):
+    """
+    solve a Sudoku grid inplace, symmetry pins the first row and column
+    when the grid is blank, backend is one of backends, cached looks the
+    grid up in solutioncache.py first
+    """
+    if backend == 'pycosat' and not cached:
+        # solve the SAT problem, with the givens eliminated beforehand
+        start = clock()
+        sol, n_clauses = solve_reduced(grid, symmetry)
+        t =  clock() - start
+        print('pycosat	clauses:', n_clauses, '	solution time:', t)
+        solved = None if sol == 'UNSAT' else read_grid(sol)
+    else:
+        start = clock()
+        solved = solve_grid(grid, symmetry, backend, cached)
+        t = clock() - start
+        print(backend, '	solution time:', t)
+    if solved is None:
+        solved = [[None] * len(grid) for row in grid]
+
+    for i, row in enumerate(solved):
+        grid[i][:] = row
+
+
+def solve_grid(grid, symmetry=False, backend='pycosat', cached=False):
+    """
+    return a solved copy of a Sudoku grid, or None if it has no solution,
+    backend is one of backends, cached solves equivalent grids only once
+    """
+    if cached:
+        return solutioncache.solveCached(
+            grid, lambda canon: backends[backend](canon, symmetry))
+    return backends[backend](grid, symmetry)
+
+
+def iter_solutions(grid, encoding='weber', limit=None):
+    """
+    yield the solved grids of a Sudoku grid, at most limit of them,
+    see solutions.py
+    """
+    import solutions
+    return solutions.iterSolutions(grid, encoding, limit)
+
+
+def count_solutions(grid, limit=2, encoding='weber'):
+    """
+    return the number of solutions of a Sudoku grid, counting no further
+    than limit, so count_solutions(grid) == 1 when the grid is unique
+    """
+    import solutions
+    return solutions.countSolutions(grid, limit, encoding)
+
+
+def _init_worker():
+    # build the base clauses once per worker instead of once per puzzle
+    templates.getTemplate('weber', 3)
+
+
+def _solve_indexed(item):
+    return item[0], solve_grid(item[1], backend=item[2], cached=item[3])
+
+
+def solve_many(puzzles, workers=None, ordered=True, chunksize=16,
+               backend='pycosat', cached=False):
+    """
+    solve an iterable of Sudoku grids on a pool of worker processes
+
+    This is a generator.  With ordered=True the solved grids are yielded
+    in the order of the puzzles, otherwise (index, grid) pairs are yielded
+    as they complete.  Unsolvable puzzles give None.  workers defaults to
+    the number of CPUs.
+
+    The portfolio backend races its encodings in processes of its own,
+    which the daemonic pool workers cannot start, so its puzzles are
+    solved one after the other in this process.
+    """
+    if backend == 'portfolio':
+        for i, grid in enumerate(puzzles):
+            solved = solve_grid(grid, backend=backend, cached=cached)
+            yield solved if ordered else (i, solved)
+        return
+    pool = multiprocessing.Pool(workers, initializer=_init_worker)
+    items = ((i, grid, backend, cached) for i, grid in enumerate(puzzles))
+    try:
+        if ordered:
+            for index, grid in pool.imap(_solve_indexed, items, chunksize):
+                yield grid
+        else:
+            for item in pool.imap_unordered(_solve_indexed, items, chunksize):
+                yield item
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,104 @@
+''' The sudoku encodings by name, each with its builder, decoder and the orders it supports
+
+	bench.py times them, portfolio.py races them and solutions.py enumerates the solutions of
+	any of them.  dlx is not an encoding but the exact cover backend of dlx.py, registered the
+	same way with its own solver in solvers.
+
+	build, decode, orders = encodings['satoku']
+	model = solvers.get('satoku', pycosat.solve)(build(grid))
+	solved = decode(model, grid)
+'''
+from functools import partial
+import pycosat
+
+import decode
+import dlx
+import pycosatSudoku
+import satoku
+import sud
+
+from satoku import gridPins as givens
+
+def orderOf(grid):
+	return int(round(len(grid)**0.5))
+
+def buildSatoku(grid, encoding='exponential'):
+	return satoku.satokuBuffer(orderOf(grid), encoding=encoding, grid=grid).toList()
+
+def decodeSatoku(model, grid):
+	return decode.decodeSatoku(model, orderOf(grid))
+
+def buildBasic(grid, encoding='exponential'):
+	return satoku.basicBuffer(orderOf(grid), encoding=encoding, grid=grid).toList()
+
+def decodeBasic(model, grid):
+	return decode.decodeBasic(model, orderOf(grid))
+
+def buildOneHot(grid, amo='pairwise'):
+	sud.n = orderOf(grid)
+	cnf = sud.sudokuClauses(amo=amo)
+	cnf.extend( [sud.v(r+1, c+1, val+1)] for r, c, val in givens(grid) )
+	return cnf
+
+def decodeOneHot(model, grid):
+	return decode.decodeOneHot(model, orderOf(grid))
+
+def buildWeber(grid):
+	cnf = pycosatSudoku.sudoku_clauses()
+	cnf.extend( [l] for l in pycosatSudoku.given_literals(grid) )
+	return cnf
+
+def decodeWeber(model, grid):
+	return decode.decodeOneHot(model, 3)
+
+def buildDLX(grid):
+	return dlx.sudokuCover(grid)
+
+def solveDLX(cover):
+	# same convention as pycosat so the callers do not care
+	solutions = cover.search(1) if cover is not None else []
+	return solutions[0] if solutions else 'UNSAT'
+
+def decodeDLX(rows, grid):
+	return dlx.readSolution(orderOf(grid), rows)
+
+# name -> (build(grid), decode(model, grid), orders it supports or None for any)
+encodings = {
+	'satoku': (buildSatoku, decodeSatoku, None),
+	'basic': (buildBasic, decodeBasic, None),
+	'satoku-aux': (partial(buildSatoku, encoding='auxiliary'), decodeSatoku, None),
+	'basic-aux': (partial(buildBasic, encoding='auxiliary'), decodeBasic, None),
+	'onehot': (buildOneHot, decodeOneHot, None),
+	'weber': (buildWeber, decodeWeber, (3,)),
+	'dlx': (buildDLX, decodeDLX, None),
+}
+
+# encodings solved by something other than pycosat
+solvers = {
+	'dlx': solveDLX,
+}
+
+def supported(names, n):
+	''' the encodings of names that can build an order n grid
+	'''
+	return [ e for e in names if encodings[e][2] is None or n in encodings[e][2] ]
+
+def solve(encoding, grid):
+	''' builds, solves and decodes grid with one encoding, returns the solved grid or None
+	'''
+	build, decodeModel, orders = encodings[encoding]
+	model = solvers.get(encoding, pycosat.solve)(build(grid))
+	if model == 'UNSAT':
+		return None
+	return [ list(map(int, row)) for row in decodeModel(model, grid) ]
+
+def isSolution(solved, grid):
+	''' True when solved is a valid grid that keeps the givens of grid
+	'''
+	n = orderOf(grid)
+	n_sqr = n**2
+	digits = list(range(1, n_sqr + 1))
+	boxes = [ [ solved[br*n + i][bc*n + j] for i in range(n) for j in range(n) ] for br in range(n) for bc in range(n) ]
+	groups = list(solved) + [ list(col) for col in zip(*solved) ] + boxes
+	return all( sorted(g) == digits for g in groups ) and \
+		all( not grid[r][c] or grid[r][c] == solved[r][c] for r in range(n_sqr) for c in range(n_sqr) )
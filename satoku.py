@@ -1,13 +1,31 @@
+from __future__ import print_function
+
 import numpy as np
 import pycosat as sat
-import time
-import math
+import numbers
+import os
 import pycosatSudoku as osud
+import decode
+import solutioncache
+import symbreak
+import templates
 
+from buildstats import clock, noStats
+from clausebuffer import ClauseBuffer, SpillBuffer
 from copy import deepcopy
+# countBits lives in decode.py, which cannot import this module
+from decode import countBits
+
+def parseBytes(text):
+	''' parses a byte count with an optional K, M or G suffix
+	'''
+	text = text.strip().upper().rstrip('B')
+	scale = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}.get(text[-1:], 1)
+	return int(float(text.rstrip('KMG')) * scale)
 
-id = {} # used to convert from string to int
-lid = [''] # used to convert from int to string
+# bytes a ClauseBuffer may take before the builders spill to disk, None for no limit
+memoryBudget = parseBytes(os.environ['SATOKU_MEMORY_BUDGET']) if os.environ.get('SATOKU_MEMORY_BUDGET') else None
+spillDir = os.environ.get('SATOKU_SPILL_DIR') # None for a temporary directory
 
 blank = [[0, 0, 0, 0, 0, 0, 0, 0, 0],
 		[0, 0, 0, 0, 0, 0, 0, 0, 0],
@@ -19,37 +37,153 @@ blank = [[0, 0, 0, 0, 0, 0, 0, 0, 0],
 		[0, 0, 0, 0, 0, 0, 0, 0, 0],
 		[0, 0, 0, 0, 0, 0, 0, 0, 0]]
 
-def conv(string):
-	''' Creates the forward conversion between a string and an integer
-	'''
-	try:
-		if id[string] == 0:
-			print string
-		return id[string]
-	except KeyError:
-		id[string] = len(id) + 1
-		lid.append(string)
-		return id[string]
-
-def genNotEqualBitPair(baseA, baseB, bit):
+class Encoder(object):
+	''' the conversion between handle strings and variable numbers of one formula, and its decoding
+
+		Formulas built with encoders of their own share no state, so any number of them can be
+		built and decoded at once, in threads as well.  layout() gives the numbering of the clause
+		blocks, cell c bit b is variable c*nBits + b + 1, and only makes the handles when they are
+		needed.  Pickling keeps the handle list, or just model and n for a layout.
+	'''
+	def __init__(self, model='satoku', n=3):
+		self.model = model
+		self.n = n
+		self.nBits = 2*countBits(n) if model == 'satoku' else countBits(n**2)
+		self.isLayout = False
+		self.id = {} # used to convert from string to int
+		self.lid = [''] # used to convert from int to string
+		
+	@classmethod
+	def layout(cls, model, n):
+		''' returns the encoder of the clause block numbering of model ('satoku' or 'basic')
+		'''
+		encoder = cls(model, n)
+		encoder.isLayout = True
+		encoder.id = encoder.lid = None
+		return encoder
+		
+	def setHandles(self, handles, nBits):
+		''' numbers bit b of handles[c] as variable c*nBits + b + 1
+		'''
+		self.lid = [''] + [ handle + 'B' + str(bit) for handle in handles for bit in range(nBits) ]
+		self.id = dict( (handle, i) for i, handle in enumerate(self.lid) if i > 0 )
+		
+	def _handles(self):
+		# a layout makes its handles on first use
+		if self.lid is None:
+			self.setHandles(satokuHandles(self.n) if self.model == 'satoku' else basicHandles(self.n), self.nBits)
+			
+	def nVars(self):
+		self._handles()
+		return len(self.lid) - 1
+		
+	def conv(self, string):
+		''' Creates the forward conversion between a string and an integer
+		'''
+		self._handles()
+		try:
+			return self.id[string]
+		except KeyError:
+			self.id[string] = len(self.lid)
+			self.lid.append(string)
+			return self.id[string]
+			
+	def intToHandle(self, values):
+		''' inverse of the conv() function
+		'''
+		self._handles()
+		handle = []
+		for e in values:
+			if e < 0:
+				handle.append( self.lid[abs(e)] + '-' )
+			else:
+				handle.append( self.lid[e] )
+		return handle
+		
+	def satToSud(self, solution, n=None, nBits=None):
+		''' converts the sat solution to a sudoku solution, nBits defaults to the bits of a value
+		'''
+		n = n or self.n
+		n_sqr = n**2
+		nBits = nBits or countBits(n_sqr)
+		self._handles()
+		
+		# auxiliary variables are either past the cell bits or have an 'X' handle
+		solution = [ e for e in solution if abs(e) < len(self.lid) ]
+		handles = [ h for h in self.intToHandle(solution) if h[0] != 'X' ]
+		if len(handles) % nBits != 0:
+			print('Invalid Solution: Bit count is wrong')
+			return None
+			
+		sud = []
+		si = -1
+		# bit numbers are not padded, B10 must sort after B9
+		handles.sort(key=handleKey)
+		for i in range(0, len(handles), nBits):
+			if (i) % (nBits*n_sqr) == 0:
+				sud.append([])
+				si += 1
+			sud[si].append(clauseToInt(handles[i:i+nBits]))
+		
+		return sud
+		
+	def satToSatoku(self, solution, n=None):
+		''' converts a sat solution from satoku to a Sudoku solution
+		'''
+		n = n or self.n
+		sud_p = self.satToSud(solution, n, 2*countBits(n))
+		sud = deepcopy(sud_p)
+		
+		for r, row in enumerate(sud_p):
+			for v, val in enumerate(row):
+				# sud_p is indexed [val][row] since the handles sort on V before R
+				c = vector2Int(sud_p[r][v], n)
+				sud[v][c] = r
+				
+		return sud
+		
+	def decode(self, solution):
+		''' returns the grid of a solution, values 0..n**2-1 like satToSud
+		'''
+		if self.isLayout:
+			# no handles needed, see decode.py
+			return (decode.decode(self.model, solution, self.n) - 1).tolist()
+		if self.model == 'satoku':
+			return self.satToSatoku(solution)
+		return self.satToSud(solution)
+		
+	def __getstate__(self):
+		state = dict(self.__dict__)
+		state['id'] = None
+		if self.isLayout:
+			state['lid'] = None
+		return state
+		
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		if self.lid is not None:
+			self.id = dict( (handle, i) for i, handle in enumerate(self.lid) if i > 0 )
+
+def genNotEqualBitPair(baseA, baseB, bit, encoder=None):
 	''' generates the single bit not equal clauses
 	
 		(A + B)(A' + B')
 	'''
+	conv = (encoder or defaultEncoder).conv
 	A = conv(baseA + 'B' + str(bit))
 	B = conv(baseB + 'B' + str(bit))
 		
 	return [ [A, B], [-A, -B] ]
 	
-def genNotEqualCNF(baseA, baseB, nBits, startBit = 0):
+def genNotEqualCNF(baseA, baseB, nBits, startBit = 0, encoder=None):
 	''' generates the multi-bit not equal cnf clauses
 	
 		(AB0 + BB0 + AB1 + BB1)(AB0' + BB0' + AB1 + BB1)(AB0 + BB0 + AB1' + BB1')(AB0' + BB0' + AB1' + BB1')
 	'''
-	cnf = genNotEqualBitPair(baseA, baseB, startBit)
+	cnf = genNotEqualBitPair(baseA, baseB, startBit, encoder)
 	
 	for i in range(startBit+1, nBits):
-		pair = genNotEqualBitPair(baseA, baseB, i)
+		pair = genNotEqualBitPair(baseA, baseB, i, encoder)
 		cnf1 = []
 		cnf2 = []
 		for j, e in enumerate(cnf):
@@ -59,24 +193,49 @@ def genNotEqualCNF(baseA, baseB, nBits, startBit = 0):
 		
 	return cnf
 	
-def genSectorConstraints(sector, nBits, id=''):
+def genNotEqualAuxCNF(baseA, baseB, nBits, startBit = 0, encoder=None):
+	''' generates the linear size not equal cnf clauses using one auxiliary variable per bit
+		XAB<i> implies bit i of A and B differ and at least one of them must hold
+	
+		(XB0 + XB1)(XB0' + AB0 + BB0)(XB0' + AB0' + BB0')(XB1' + AB1 + BB1)(XB1' + AB1' + BB1')
+	'''
+	conv = (encoder or defaultEncoder).conv
+	aux = [ conv('X' + baseA + baseB + 'B' + str(i)) for i in range(startBit, nBits) ]
+	cnf = [ aux ]
+	
+	for i, x in zip(range(startBit, nBits), aux):
+		A = conv(baseA + 'B' + str(i))
+		B = conv(baseB + 'B' + str(i))
+		cnf.append( [-x, A, B] )
+		cnf.append( [-x, -A, -B] )
+		
+	return cnf
+	
+notEqualEncodings = {'exponential': genNotEqualCNF, 'auxiliary': genNotEqualAuxCNF}
+	
+def genSectorConstraints(sector, nBits, id='', cnf=None, encoding='exponential', encoder=None):
 	''' generates cnf clauses that insure none the values sector[i]+id are equal
+		clauses are appended to cnf (a list or ClauseBuffer) when it is given
 	'''
+	genNotEqual = notEqualEncodings[encoding]
 	n_sqr = len(sector)
-	cnf = []
+	if cnf is None:
+		cnf = []
 	
 	for i in range(n_sqr):
 		for j in range(i+1, n_sqr):
-			cnf = cnf + genNotEqualCNF(sector[i]+id, sector[j]+id, nBits)
+			cnf.extend( genNotEqual(sector[i]+id, sector[j]+id, nBits, encoder=encoder) )
 	
 	return cnf
 	
-def genGroupConstraints(group, nBits, id=''):
+def genGroupConstraints(group, nBits, id='', cnf=None, encoding='exponential', encoder=None):
 	''' generates cnf clauses that insure none the values sector[i]+id are equal
 		this assumes that column and row not-equal clauses will be generated
 		group must be an nXn array
 	'''
-	cnf = []
+	genNotEqual = notEqualEncodings[encoding]
+	if cnf is None:
+		cnf = []
 	n = len(group)
 	n_sqr = n**2
 	
@@ -86,45 +245,73 @@ def genGroupConstraints(group, nBits, id=''):
 			if (i//n == j//n) or (i%n == j%n):
 				continue
 			else:
-				cnf = cnf + genNotEqualCNF(sector[i]+id, sector[j] + id, nBits)
+				cnf.extend( genNotEqual(sector[i]+id, sector[j] + id, nBits, encoder=encoder) )
 	
 	return cnf
 
-def genReducedSectorContraints(sector, nBits, id=''):
+def genReducedSectorContraints(sector, nBits, id='', cnf=None, encoding='exponential', encoder=None):
 	''' generates the cnf clauses for a satdoku orthogonal sector
 	'''
+	genNotEqual = notEqualEncodings[encoding]
 	n_sqr = len(sector)
 	n = n_sqr**0.5
 	startBit = nBits // 2
 	
-	cnf = []
+	if cnf is None:
+		cnf = []
 	
 	# general column constraints
 	for i in range(n_sqr):
 		for j in range(i+1, n_sqr):
 			if i // n == j // n: # special case these can't even be in the same group
-				cnf = cnf + genNotEqualCNF(sector[i] + id, sector[j] + id, nBits, startBit)
+				cnf.extend( genNotEqual(sector[i] + id, sector[j] + id, nBits, startBit, encoder) )
 			else:
-				cnf = cnf + genNotEqualCNF(sector[i] + id, sector[j] + id, nBits)
+				cnf.extend( genNotEqual(sector[i] + id, sector[j] + id, nBits, encoder=encoder) )
 	return cnf
 	
-def countBits(n, even=False):
-	''' Returns the number of bits necessary to encode the value n
+# used by the legacy module level functions (conv, satToSud, satToSatoku, ...) only, the builders
+# number their variables with an encoder of their own
+defaultEncoder = Encoder()
+
+def newEncoder(model='satoku', n=3):
+	''' replaces the default encoder of the legacy module level functions with a fresh one
 	'''
-	nBits = int (math.ceil( math.log ( n ) / math.log(2) ))
-	
-	if even  and (nBits & 1) == 1:
-		nBits += 1
-	
-	return nBits
-	
-def satokuCNF(n):
+	global defaultEncoder
+	defaultEncoder = Encoder(model, n)
+	return defaultEncoder
+
+def conv(string):
+	''' Creates the forward conversion between a string and an integer in the default encoder
+	'''
+	return defaultEncoder.conv(string)
+
+def checkClauseList(cnf, n):
+	''' raises TypeError when cnf is the rows of an order n puzzle rather than clauses, as in
+		satokuCNF(3, puzzle), which would otherwise add the clauses to the puzzle and encode no givens
+	'''
+	n_sqr = n**2
+	if isinstance(cnf, list) and len(cnf) == n_sqr and \
+			all( isinstance(row, (list, tuple)) and len(row) == n_sqr and all( isinstance(val, numbers.Integral) and 0 <= val <= n_sqr for val in row ) for row in cnf ):
+		raise TypeError('cnf holds the rows of a puzzle, pass the puzzle as grid=')
+
+def satokuCNF(n, cnf=None, encoding='exponential', symmetry=False, stats=None, encoder=None, grid=None):
 	''' generate the satoku cnf encoding
+		grid is a puzzle (0 for blank, values 1..n**2), each given fixes the column bits of its
+		V<val>R<row> cell with unit clauses, encoder.satToSatoku decodes the solution, pass it
+		as grid=, a puzzle in the place of cnf raises TypeError
+		clauses are appended to cnf (a list or ClauseBuffer) when it is given
+		encoding selects the not equal clauses, 'exponential' or 'auxiliary' (see genNotEqualAuxCNF)
+		symmetry pins the first row and column, only for blank grids (see symbreak.py)
+		stats, a buildstats.BuildStats, is filled in with the figures of each phase
+		encoder, an Encoder, numbers the variables, pass one to decode the result with its
+		decode(), by default a fresh one is used and module state is left alone
 	'''
 	
-	id = {}
-	lid = ['']
-	cnf = []
+	encoder = encoder or Encoder('satoku', n)
+	if cnf is None:
+		cnf = []
+	checkClauseList(cnf, n)
+	stats = stats or noStats
 	n_sqr = n**2
 	nBits = 2*countBits(n)
 	
@@ -132,124 +319,702 @@ def satokuCNF(n):
 		nBits += 1
 	
 	#create handles
-	cells = np.array( [ ['V' + str(val).zfill(3) + 'R' + str(row).zfill(3) for val in range(n_sqr) ] for row in range(n_sqr)] )
+	stats.begin('handles', cnf)
+	cells = np.array( [ [ satokuHandle(n, row, val) for val in range(n_sqr) ] for row in range(n_sqr)] )
 
 	#generate row constraints
+	stats.begin('row', cnf)
 	for row in range(n_sqr):
-		cnf = cnf + genSectorConstraints(cells[row, :], nBits)
+		genSectorConstraints(cells[row, :], nBits, cnf=cnf, encoding=encoding, encoder=encoder)
 	
 	#generate column constraints ( don't forget about the group simplification)
+	stats.begin('column', cnf)
 	for val in range(n_sqr):
-		cnf = cnf + genReducedSectorContraints(cells[:, val], nBits)
+		genReducedSectorContraints(cells[:, val], nBits, cnf=cnf, encoding=encoding, encoder=encoder)
 		
+	pins = gridPins(grid)
+	var = lambda c, b: encoder.conv(cells[c // n_sqr, c % n_sqr] + 'B' + str(b))
+	if pins:
+		stats.begin('givens', cnf)
+		cnf.extend( [l] for l in satokuPinLiterals(n, pins, var) )
+	elif symmetry:
+		stats.begin('symmetry', cnf)
+		cnf.extend( [l] for l in satokuPinLiterals(n, symbreak.pins(n), var) )
+	
 	#generate null value constraints
+	stats.begin('null value', cnf)
 	prototypeL = genNullValuePrototypeCNF(n)
 	
 	if prototypeL == None:
+		stats.end(cnf)
 		return cnf
 
 	prototypeH = shiftPrototype(prototypeL)
 	
 	for row in cells:
 		for cell in row:
-			cnf = cnf + convertToBase(prototypeL, cell)
-			cnf = cnf + convertToBase(prototypeH, cell)
+			cnf.extend( convertToBase(prototypeL, cell, encoder) )
+			cnf.extend( convertToBase(prototypeH, cell, encoder) )
 
+	stats.end(cnf)
 	return cnf
 	
-def basicCNF(n):
+def basicCNF(n, cnf=None, encoding='exponential', symmetry=False, stats=None, encoder=None, grid=None):
 	''' generate the standard sudoku cnf encoding
+		grid is a puzzle (0 for blank, values 1..n**2), each given fixes the value bits of its
+		R<row>C<col> cell with unit clauses, encoder.satToSud decodes the solution, pass it
+		as grid=, a puzzle in the place of cnf raises TypeError
+		clauses are appended to cnf (a list or ClauseBuffer) when it is given
+		encoding selects the not equal clauses, 'exponential' or 'auxiliary' (see genNotEqualAuxCNF)
+		symmetry pins the first row and column, only for blank grids (see symbreak.py)
+		stats, a buildstats.BuildStats, is filled in with the figures of each phase
+		encoder, an Encoder, numbers the variables, pass one to decode the result with its
+		decode(), by default a fresh one is used and module state is left alone
 	'''
 	
-	id = {}
-	lid = ['']
-	cnf = []
+	encoder = encoder or Encoder('basic', n)
+	if cnf is None:
+		cnf = []
+	checkClauseList(cnf, n)
+	stats = stats or noStats
 	n_sqr = n**2
 	nBits = countBits(n_sqr)
 	
 	#create handles
-	cells = np.array( [ [ 'R' + str(row).zfill(3) + 'C' + str(col).zfill(3) for col in range(n_sqr)] for row in range(n_sqr) ] )
+	stats.begin('handles', cnf)
+	cells = np.array( [ [ basicHandle(n, row, col) for col in range(n_sqr)] for row in range(n_sqr) ] )
 	
 	#generate row constraints
+	stats.begin('row', cnf)
 	for row in range(n_sqr):
-		cnf = cnf + genSectorConstraints(cells[row, :], nBits)
+		genSectorConstraints(cells[row, :], nBits, cnf=cnf, encoding=encoding, encoder=encoder)
 
 	#generate column constraints
+	stats.begin('column', cnf)
 	for col in range(n_sqr):
-		cnf = cnf + genSectorConstraints(cells[:, col], nBits)
+		genSectorConstraints(cells[:, col], nBits, cnf=cnf, encoding=encoding, encoder=encoder)
 		
 	#generate group constraints
+	stats.begin('group', cnf)
 	r_prev = 0
 	for r in range(n, n_sqr+1, n):
 		c_prev = 0
 		for c in range(n, n_sqr+1, n):
 			group = cells[r_prev:r, c_prev:c]
-			cnf = cnf + genGroupConstraints(group, nBits)
+			genGroupConstraints(group, nBits, cnf=cnf, encoding=encoding, encoder=encoder)
 			c_prev = c
 		r_prev = r
 	
+	pins = gridPins(grid)
+	var = lambda c, b: encoder.conv(cells[c // n_sqr, c % n_sqr] + 'B' + str(b))
+	if pins:
+		stats.begin('givens', cnf)
+		cnf.extend( [l] for l in basicPinLiterals(n, pins, var) )
+	elif symmetry:
+		stats.begin('symmetry', cnf)
+		cnf.extend( [l] for l in basicPinLiterals(n, symbreak.pins(n), var) )
+	
 	#generate null value constraints
+	stats.begin('null value', cnf)
 	prototype = genNullValuePrototypeCNF(n_sqr)
 	if prototype == None:
+		stats.end(cnf)
 		return cnf
 
 	for row in cells:
 		for cell in row:
-			cnf = cnf + convertToBase(prototype, cell)
+			cnf.extend( convertToBase(prototype, cell, encoder) )
+	stats.end(cnf)
+	return cnf
+	
+def cellVars(cells, nBits, startBit=0):
+	''' returns the variable numbers of the bits startBit..nBits-1 of each cell index in cells
+
+		cell c bit b is variable c*nBits + b + 1, the same order the handles sort in
+	'''
+	bits = np.arange(startBit, nBits)
+	return np.asarray(cells)[:, None]*nBits + bits + 1
+
+def signPatterns(k):
+	''' returns the 2**k by k array of literal signs, row p holds -1 where bit j of p is set
+	'''
+	p = np.arange(2**k)
+	return 1 - 2*((p[:, None] >> np.arange(k)) & 1)
+
+def notEqualBlock(cellsA, cellsB, nBits, startBit=0):
+	''' array version of genNotEqualCNF for every pair (cellsA[i], cellsB[i]) at once
+
+		returns a (len(cellsA) * 2**k) by 2k array of literals where k = nBits - startBit
+	'''
+	A = cellVars(cellsA, nBits, startBit)
+	B = cellVars(cellsB, nBits, startBit)
+	signs = signPatterns(nBits - startBit)
+	
+	block = np.empty( (len(A), len(signs), nBits - startBit, 2), dtype=np.int32 )
+	block[..., 0] = A[:, None, :]*signs
+	block[..., 1] = B[:, None, :]*signs
+	return block.reshape(-1, 2*(nBits - startBit))
+
+def notEqualAuxBlocks(cellsA, cellsB, nBits, startBit, firstAux):
+	''' array version of genNotEqualAuxCNF, pair i uses the auxiliary variables
+		firstAux + i*k .. firstAux + (i+1)*k - 1 where k = nBits - startBit
+
+		returns the len(cellsA) by k block of at least one difference clauses and the
+		2*len(cellsA)*k by 3 block tying each auxiliary variable to its bit
+	'''
+	k = nBits - startBit
+	A = cellVars(cellsA, nBits, startBit)
+	B = cellVars(cellsB, nBits, startBit)
+	X = firstAux + np.arange(len(A)*k).reshape(len(A), k)
+	
+	diff = np.empty( (len(A), k, 2, 3), dtype=np.int32 )
+	diff[..., 0] = -X[:, :, None]
+	diff[:, :, 0, 1] = A
+	diff[:, :, 0, 2] = B
+	diff[:, :, 1, 1] = -A
+	diff[:, :, 1, 2] = -B
+	return [ X.astype(np.int32), diff.reshape(-1, 3) ]
+
+def notEqualBlocks(cellsA, cellsB, nBits, startBit, encoding, nextVar):
+	''' returns the not equal clause blocks of the pairs in the selected encoding
+		and the next free variable after any auxiliary variables they use
+	'''
+	if encoding == 'exponential':
+		return [ notEqualBlock(cellsA, cellsB, nBits, startBit) ], nextVar
+	elif encoding == 'auxiliary':
+		blocks = notEqualAuxBlocks(cellsA, cellsB, nBits, startBit, nextVar)
+		return blocks, nextVar + len(cellsA)*(nBits - startBit)
+	raise ValueError('unknown not equal encoding %r' % (encoding,))
+
+def notEqualSizes(pairs, k, encoding):
+	''' returns the (auxiliary variable, clause, literal) counts of pairs not equal constraints over k bits
+	'''
+	if encoding == 'auxiliary':
+		return pairs*k, pairs*(1 + 2*k), pairs*7*k
+	return 0, pairs * 2**k, pairs * 2**k * 2*k
+
+def notEqualCounts(pairs, k, encoding):
+	''' returns the (auxiliary variable, clause) counts of pairs not equal constraints over k bits
+	'''
+	return notEqualSizes(pairs, k, encoding)[:2]
+
+def sectorPairs(sector):
+	''' returns every pair (sector[i], sector[j]) with i < j as two arrays
+	'''
+	sector = np.asarray(sector)
+	i, j = np.triu_indices(len(sector), 1)
+	return sector[i], sector[j]
+
+def nullValueBlock(cells, n, nBits, startBit=0):
+	''' array version of convertToBase(genNullValuePrototypeCNF(n), cell) for every cell at once
+		the value bits are startBit..startBit+countBits(n)-1
+	'''
+	vBits = countBits(n)
+	nullValueCount = (2**vBits) - n
+	if nullValueCount == 0:
+		return np.empty( (0, vBits), dtype=np.int32 )
+		
+	signs = signPatterns(vBits)[-nullValueCount:]
+	V = cellVars(cells, nBits, startBit)[:, :vBits]
+	block = V[:, None, :]*signs
+	return block.reshape(-1, vBits).astype(np.int32)
+
+def satokuSector(n, phase, index, encoding='exponential', nextVar=None):
+	''' returns (clause blocks, next free variable) of one sector of the satoku encoding, the
+		'row', 'column' or 'null value' constraints of row / value index
+
+		sectors only share the auxiliary variables, which start at nextVar (by default the first
+		one after the cell bits), so they can be built in any order or at once
+	'''
+	n_sqr = n**2
+	half = countBits(n)
+	nBits = 2*half
+	cells = np.arange(n_sqr**2).reshape(n_sqr, n_sqr)
+	if nextVar is None:
+		nextVar = n_sqr**2 * nBits + 1
+	
+	if phase == 'row':
+		A, B = sectorPairs(cells[index])
+		return notEqualBlocks(A, B, nBits, 0, encoding, nextVar)
+		
+	if phase == 'column':
+		#rows in the same band only need the upper (group) bits
+		column = cells[:, index]
+		i, j = np.triu_indices(n_sqr, 1)
+		band = (i // n) == (j // n)
+		blocks, nextVar = notEqualBlocks(column[i[band]], column[j[band]], nBits, half, encoding, nextVar)
+		more, nextVar = notEqualBlocks(column[i[~band]], column[j[~band]], nBits, 0, encoding, nextVar)
+		return blocks + more, nextVar
+		
+	if phase == 'null value':
+		if (2**half) == n:
+			return [], nextVar
+		row = cells[index]
+		lower = nullValueBlock(row, n, nBits)
+		upper = nullValueBlock(row, n, nBits, half)
+		per = len(lower) // len(row)
+		null = np.concatenate( (lower.reshape(len(row), per, half), upper.reshape(len(row), per, half)), axis=1 )
+		return [ null.reshape(-1, half) ], nextVar
+		
+	raise ValueError('unknown satoku sector %r' % (phase,))
+
+def satokuSectorSizes(n, phase, encoding='exponential'):
+	''' returns the (auxiliary variable, clause, literal) counts of any one satoku sector of phase
+	'''
+	n_sqr = n**2
+	half = countBits(n)
+	nBits = 2*half
+	pairs = n_sqr*(n_sqr - 1) // 2
+	bandPairs = n * (n*(n - 1) // 2)
+	if phase == 'row':
+		return notEqualSizes(pairs, nBits, encoding)
+	if phase == 'column':
+		band = notEqualSizes(bandPairs, half, encoding)
+		other = notEqualSizes(pairs - bandPairs, nBits, encoding)
+		return tuple( a + b for a, b in zip(band, other) )
+	if phase == 'null value':
+		clauses = n_sqr * 2 * (2**half - n)
+		return 0, clauses, clauses * half
+	raise ValueError('unknown satoku sector %r' % (phase,))
+
+def iterSatokuPhases(n, encoding='exponential', symmetry=False, grid=None):
+	''' generate the satoku cnf encoding as a stream of (phase, numpy clause block) pairs, one per sector
+
+		same clauses as satokuCNF(n, encoding=encoding, symmetry=symmetry, grid=grid) with cell V<val>R<row>
+		at index row*n**2 + val, auxiliary variables follow the cell bits
+	'''
+	n_sqr = n**2
+	nextVar = None
+	
+	#generate row constraints, then the column constraints of each value
+	for phase in ('row', 'column'):
+		for index in range(n_sqr):
+			blocks, nextVar = satokuSector(n, phase, index, encoding, nextVar)
+			for block in blocks:
+				yield phase, block
+	
+	if gridPins(grid):
+		yield 'givens', np.array(satokuGivenUnits(n, grid), dtype=np.int32).reshape(-1, 1)
+	elif symmetry:
+		yield 'symmetry', np.array(satokuSymmetryUnits(n), dtype=np.int32).reshape(-1, 1)
+	
+	#generate null value constraints
+	for index in range(n_sqr):
+		blocks, nextVar = satokuSector(n, 'null value', index, encoding, nextVar)
+		for block in blocks:
+			yield 'null value', block
+
+def satokuBuffer(n, cnf=None, encoding='exponential', symmetry=False, stats=None, grid=None):
+	''' generate the satoku cnf encoding into a ClauseBuffer
+		stats, a buildstats.BuildStats, is filled in with the figures of each phase
+	'''
+	if cnf is None:
+		cnf = ClauseBuffer()
+	stats = stats or noStats
+	current = None
+	for phase, block in iterSatokuPhases(n, encoding, symmetry, grid):
+		if phase != current:
+			stats.begin(phase, cnf)
+			current = phase
+		cnf.extend(block)
+	stats.end(cnf)
+	return cnf
+
+def satokuSizes(n, encoding='exponential', symmetry=False):
+	''' returns the (variable, clause, literal) counts of the satoku encoding without building it
+	'''
+	n_sqr = n**2
+	half = countBits(n)
+	nBits = 2*half
+	pairs = n_sqr*(n_sqr - 1) // 2
+	bandPairs = n * (n*(n - 1) // 2)
+	
+	nVars = n_sqr**2 * nBits
+	clauses = n_sqr**2 * 2 * (2**half - n)
+	literals = clauses * half
+	for count, k in ( (n_sqr*pairs, nBits), (n_sqr*bandPairs, half), (n_sqr*(pairs - bandPairs), nBits) ):
+		aux, c, l = notEqualSizes(count, k, encoding)
+		nVars += aux
+		clauses += c
+		literals += l
+	if symmetry:
+		clauses += (2*n_sqr - 1) * nBits
+		literals += (2*n_sqr - 1) * nBits
+	return nVars, clauses, literals
+
+def satokuCounts(n, encoding='exponential', symmetry=False):
+	''' returns the (variable, clause) counts of the satoku encoding without building it
+	'''
+	return satokuSizes(n, encoding, symmetry)[:2]
+
+def basicSector(n, phase, index, encoding='exponential', nextVar=None):
+	''' returns (clause blocks, next free variable) of one sector of the standard encoding, the
+		'row', 'column', 'group' or 'null value' constraints of row / column / group index
+
+		sectors only share the auxiliary variables, which start at nextVar (by default the first
+		one after the cell bits), so they can be built in any order or at once
+	'''
+	n_sqr = n**2
+	nBits = countBits(n_sqr)
+	cells = np.arange(n_sqr**2).reshape(n_sqr, n_sqr)
+	if nextVar is None:
+		nextVar = n_sqr**2 * nBits + 1
+	
+	if phase in ('row', 'column'):
+		A, B = sectorPairs(cells[index] if phase == 'row' else cells[:, index])
+		return notEqualBlocks(A, B, nBits, 0, encoding, nextVar)
+		
+	if phase == 'group':
+		#skipping pairs already covered by a row or column
+		i, j = np.triu_indices(n_sqr, 1)
+		keep = ((i // n) != (j // n)) & ((i % n) != (j % n))
+		group = cells.reshape(n, n, n, n).transpose(0, 2, 1, 3).reshape(n_sqr, n_sqr)[index]
+		return notEqualBlocks(group[i[keep]], group[j[keep]], nBits, 0, encoding, nextVar)
+		
+	if phase == 'null value':
+		if (2**nBits) == n_sqr:
+			return [], nextVar
+		return [ nullValueBlock(cells[index], n_sqr, nBits) ], nextVar
+		
+	raise ValueError('unknown basic sector %r' % (phase,))
+
+def basicSectorSizes(n, phase, encoding='exponential'):
+	''' returns the (auxiliary variable, clause, literal) counts of any one basic sector of phase
+	'''
+	n_sqr = n**2
+	nBits = countBits(n_sqr)
+	pairs = n_sqr*(n_sqr - 1) // 2
+	if phase in ('row', 'column'):
+		return notEqualSizes(pairs, nBits, encoding)
+	if phase == 'group':
+		return notEqualSizes(pairs - 2 * n * (n*(n - 1) // 2), nBits, encoding)
+	if phase == 'null value':
+		clauses = n_sqr * (2**nBits - n_sqr)
+		return 0, clauses, clauses * nBits
+	raise ValueError('unknown basic sector %r' % (phase,))
+
+def iterBasicPhases(n, encoding='exponential', symmetry=False, grid=None):
+	''' generate the standard sudoku cnf encoding as a stream of (phase, numpy clause block) pairs, one per sector
+
+		same clauses as basicCNF(n, encoding=encoding, symmetry=symmetry, grid=grid) with cell R<row>C<col>
+		at index row*n**2 + col, auxiliary variables follow the cell bits
+	'''
+	n_sqr = n**2
+	nextVar = None
+	
+	#generate row, column and group constraints
+	for phase in ('row', 'column', 'group'):
+		for index in range(n_sqr):
+			blocks, nextVar = basicSector(n, phase, index, encoding, nextVar)
+			for block in blocks:
+				yield phase, block
+	
+	if gridPins(grid):
+		yield 'givens', np.array(basicGivenUnits(n, grid), dtype=np.int32).reshape(-1, 1)
+	elif symmetry:
+		yield 'symmetry', np.array(basicSymmetryUnits(n), dtype=np.int32).reshape(-1, 1)
+	
+	#generate null value constraints
+	for index in range(n_sqr):
+		blocks, nextVar = basicSector(n, 'null value', index, encoding, nextVar)
+		for block in blocks:
+			yield 'null value', block
+
+def basicBuffer(n, cnf=None, encoding='exponential', symmetry=False, stats=None, grid=None):
+	''' generate the standard sudoku cnf encoding into a ClauseBuffer
+		stats, a buildstats.BuildStats, is filled in with the figures of each phase
+	'''
+	if cnf is None:
+		cnf = ClauseBuffer()
+	stats = stats or noStats
+	current = None
+	for phase, block in iterBasicPhases(n, encoding, symmetry, grid):
+		if phase != current:
+			stats.begin(phase, cnf)
+			current = phase
+		cnf.extend(block)
+	stats.end(cnf)
 	return cnf
+
+def basicSizes(n, encoding='exponential', symmetry=False):
+	''' returns the (variable, clause, literal) counts of the basic encoding without building it
+	'''
+	n_sqr = n**2
+	nBits = countBits(n_sqr)
+	pairs = n_sqr*(n_sqr - 1) // 2
+	groupPairs = pairs - 2 * n * (n*(n - 1) // 2)
+	
+	aux, clauses, literals = notEqualSizes(2*n_sqr*pairs + n_sqr*groupPairs, nBits, encoding)
+	null = n_sqr**2 * (2**nBits - n_sqr)
+	clauses += null
+	literals += null * nBits
+	if symmetry:
+		clauses += (2*n_sqr - 1) * nBits
+		literals += (2*n_sqr - 1) * nBits
+	return n_sqr**2 * nBits + aux, clauses, literals
+
+def basicCounts(n, encoding='exponential', symmetry=False):
+	''' returns the (variable, clause) counts of the basic encoding without building it
+	'''
+	return basicSizes(n, encoding, symmetry)[:2]
+
+sizeFunctions = {'satoku': satokuSizes, 'basic': basicSizes}
+builderFunctions = {'satoku': satokuBuffer, 'basic': basicBuffer}
+
+# the independent sectors of each model, built with sectorFunctions, the givens or symmetry units
+# come right before the null value constraints
+sectorFunctions = {'satoku': (satokuSector, satokuSectorSizes), 'basic': (basicSector, basicSectorSizes)}
+sectorPhases = {'satoku': ('row', 'column', 'null value'), 'basic': ('row', 'column', 'group', 'null value')}
+
+def estimate(n, model='satoku', encoding='exponential', symmetry=False, budget=None, grid=None):
+	''' returns the expected size of a formula before building it
+
+		variables, clauses and literals are exact, counting a unit clause per given bit of grid
+		in place of the symmetry breaking ones as the builders do.  bufferBytes is the size as a ClauseBuffer,
+		listBytes roughly the peak memory of making the list of lists pycosat is handed (64 bit
+		CPython) and dimacsBytes roughly the size of the DIMACS file.  fits tells whether
+		bufferBytes is within budget, which defaults to memoryBudget.
+	'''
+	if budget is None:
+		budget = memoryBudget
+	pins = gridPins(grid)
+	nVars, clauses, literals = sizeFunctions[model](n, encoding, symmetry and not pins)
+	if pins:
+		units = len(givenUnitFunctions[model](n, grid))
+		clauses += units
+		literals += units
+	digits = len(str(nVars)) + 1.5 # sign, digits and the separating space, on average
+	size = {
+		'n': n, 'model': model, 'encoding': encoding,
+		'variables': nVars, 'clauses': clauses, 'literals': literals,
+		'bufferBytes': 4*literals + 8*(clauses + 1),
+		'listBytes': 64*clauses + 44*literals,
+		'dimacsBytes': int(digits*literals + 2*clauses),
+		'budget': budget,
+	}
+	size['fits'] = budget is None or size['bufferBytes'] <= budget
+	return size
+
+def buildBuffer(n, model='satoku', encoding='exponential', symmetry=False, budget=None, directory=None, stats=None, workers=1, grid=None):
+	''' builds a formula into a ClauseBuffer when its estimate fits in budget (memoryBudget by
+		default) and into a SpillBuffer in directory (spillDir by default) otherwise
+		workers other than 1 builds a formula that fits on a pool of processes (None for every
+		CPU, see parallelbuild.py), the phases run side by side there so stats only get one
+		'build' phase.  grid is a puzzle whose givens become unit clauses, as in satokuBuffer
+	'''
+	size = estimate(n, model, encoding, symmetry, budget, grid)
+	if size['fits'] and workers != 1:
+		import parallelbuild
+		stats = stats or noStats
+		stats.begin('build')
+		cnf = parallelbuild.parallelBuffer(n, model, encoding, symmetry, workers=workers, grid=grid)
+		stats.end(cnf)
+		return cnf
+	if size['fits']:
+		cnf = ClauseBuffer(size['literals'], size['clauses'])
+	else:
+		# budget // 16 literals is a quarter of the budget, leaving room for the block being built
+		cnf = SpillBuffer(directory or spillDir, max(size['budget'] // 16, 1 << 16), model)
+	return builderFunctions[model](n, cnf, encoding, symmetry, stats, grid)
+
+def gridPins(grid):
+	''' returns the (row, col, val) of each given of a puzzle, 0 based, [] for None
+	'''
+	if grid is None:
+		return []
+	return [ (r, c, val - 1) for r, row in enumerate(grid) for c, val in enumerate(row) if val ]
+
+def satokuPinLiterals(n, pins, var):
+	''' returns the unit literals fixing each (row, col, val) of pins in the satoku encoding
+		var(cell, bit) is the variable of bit of cell V<val>R<row>, which holds the column
+	'''
+	n_sqr = n**2
+	half = countBits(n)
+	lits = []
+	for row, col, val in pins:
+		cell = row*n_sqr + val
+		vector = ( (col // n) << half ) | (col % n)
+		for bit in range(2*half):
+			lits.append( var(cell, bit) if (vector >> bit) & 1 else -var(cell, bit) )
+	return lits
+
+def basicPinLiterals(n, pins, var):
+	''' returns the unit literals fixing each (row, col, val) of pins in the basic encoding
+		var(cell, bit) is the variable of bit of cell R<row>C<col>, which holds the value
+	'''
+	n_sqr = n**2
+	nBits = countBits(n_sqr)
+	lits = []
+	for row, col, val in pins:
+		cell = row*n_sqr + col
+		for bit in range(nBits):
+			lits.append( var(cell, bit) if (val >> bit) & 1 else -var(cell, bit) )
+	return lits
+
+def satokuGivenUnits(n, grid):
+	''' unit literals fixing the givens of a puzzle in the block layout
+	'''
+	nBits = 2*countBits(n)
+	return satokuPinLiterals(n, gridPins(grid), lambda c, b: c*nBits + b + 1)
+
+def satokuSymmetryUnits(n):
+	''' unit literals pinning the first row and column of a blank grid in the block layout
+	'''
+	nBits = 2*countBits(n)
+	return satokuPinLiterals(n, symbreak.pins(n), lambda c, b: c*nBits + b + 1)
+
+def basicGivenUnits(n, grid):
+	''' unit literals fixing the givens of a puzzle in the block layout
+	'''
+	nBits = countBits(n**2)
+	return basicPinLiterals(n, gridPins(grid), lambda c, b: c*nBits + b + 1)
+
+def basicSymmetryUnits(n):
+	''' unit literals pinning the first row and column of a blank grid in the block layout
+	'''
+	nBits = countBits(n**2)
+	return basicPinLiterals(n, symbreak.pins(n), lambda c, b: c*nBits + b + 1)
+
+givenUnitFunctions = {'satoku': satokuGivenUnits, 'basic': basicGivenUnits}
+symmetryUnitFunctions = {'satoku': satokuSymmetryUnits, 'basic': basicSymmetryUnits}
+
+def unitLiterals(n, model='satoku', grid=None, symmetry=False):
+	''' returns the unit literals of the givens of grid in the block layout, or of the symmetry
+		breaking when grid has none and symmetry is set
+	'''
+	if gridPins(grid):
+		return givenUnitFunctions[model](n, grid)
+	if symmetry:
+		return symmetryUnitFunctions[model](n)
+	return []
+
+def setHandleLayout(handles, nBits):
+	''' resets the default encoder so variable c*nBits + b + 1 is handles[c] + 'B' + b
+		this is the numbering used by the clause blocks, so satToSud can decode their solutions,
+		Encoder.layout() does the same without touching the default
+	'''
+	newEncoder().setHandles(handles, nBits)
+	
+def handleDigits(n):
+	''' width the row, column and value numbers of order n handles are padded to, so the
+		handles sort in cell order (satToSud relies on it)
+	'''
+	return max(3, len(str(n**2 - 1)))
+
+def satokuHandle(n, row, val):
+	w = handleDigits(n)
+	return 'V' + str(val).zfill(w) + 'R' + str(row).zfill(w)
+
+def basicHandle(n, row, col):
+	w = handleDigits(n)
+	return 'R' + str(row).zfill(w) + 'C' + str(col).zfill(w)
+
+def satokuHandles(n):
+	''' returns the satoku cell handles in cell index order
+	'''
+	n_sqr = n**2
+	return [ satokuHandle(n, row, val) for row in range(n_sqr) for val in range(n_sqr) ]
 	
-def compare(stop):
+def basicHandles(n):
+	''' returns the basic cell handles in cell index order
+	'''
+	n_sqr = n**2
+	return [ basicHandle(n, row, col) for row in range(n_sqr) for col in range(n_sqr) ]
+
+templates.register('satoku', lambda n: satokuBuffer(n).toList())
+templates.register('basic', lambda n: basicBuffer(n).toList())
+templates.register('satoku-aux', lambda n: satokuBuffer(n, encoding='auxiliary').toList())
+templates.register('basic-aux', lambda n: basicBuffer(n, encoding='auxiliary').toList())
+
+templateSuffix = {'exponential': '', 'auxiliary': '-aux'}
+	
+def compare(stop, encodings=('exponential', 'auxiliary'), symmetry=False):
+	''' single sample comparison of the not equal encodings on blank grids
+		bench.py does repeated timings of every encoding with percentiles
+	'''
 
 	for n in range(2, stop+1):
-		print 'n:', n
-		runSatoku(n)
-		runBasic(n)
-		print ''
+		print('n:', n)
+		for encoding in encodings:
+			runSatoku(n, encoding, symmetry)
+			runBasic(n, encoding, symmetry)
+		print('')
+		
+def solveGrid(grid, model='satoku', encoding='exponential', symmetry=False, cached=False):
+	''' returns a solved copy of a puzzle (0 for blank, values 1..n**2) or None when it has none
+		the cached template of model gets one unit clause per given bit
+		cached looks up equivalent puzzles in solutioncache.py first
+	'''
+	if cached:
+		return solutioncache.solveCached(grid, lambda canon: solveGrid(canon, model, encoding, symmetry))
+	n = int(round(len(grid)**0.5))
+	sol = sat.solve(templates.withUnits(model + templateSuffix[encoding], n, unitLiterals(n, model, grid, symmetry)))
+	if sol == 'UNSAT':
+		return None
+	return decode.decode(model, sol, n).tolist()
+
+def literalCount(cnf):
+	''' returns the total number of literals in the cnf clauses
+	'''
+	return sum( len(clause) for clause in cnf )
 		
-def runBasic(n):
-	global id
-	global lid
-	id = {}
-	lid = [''] 
-	start = time.clock()
-	basic = basicCNF(n)
-	cTime = (time.clock() - start) 
-	
-	start = time.clock()
+def runFormula(model, n, encoding='exponential', symmetry=False, stats=None, grid=None):
+	''' returns the formula runBasic / runSatoku solve and the seconds it took
+		without stats it is the cached template with the unit clauses added, with stats it is
+		built from scratch by builderFunctions so every phase is recorded, followed by the
+		'list' phase of the conversion pycosat needs
+	'''
+	start = clock()
+	if stats is None:
+		units = unitLiterals(n, model, grid, symmetry)
+		return templates.withUnits(model + templateSuffix[encoding], n, units), clock() - start
+	cnf = builderFunctions[model](n, None, encoding, symmetry, stats, grid)
+	with stats.phase('list'):
+		cnf = cnf.toList()
+	return cnf, clock() - start
+
+def runBasic(n, encoding='exponential', symmetry=False, stats=None, grid=None):
+	basic, cTime = runFormula('basic', n, encoding, symmetry, stats, grid)
+	stats = stats or noStats
+	encoder = Encoder.layout('basic', n)
+	
+	stats.begin('solve')
+	start = clock()
 	basSol = sat.solve(basic)
-	basTime = (time.clock() - start)
+	basTime = (clock() - start)
+	stats.end()
 	
 	if type(basSol) == type([]):
 		basSolExists = True
 	else:
 		basSolExists = False
 	
-	print '	basic   solution:', basSolExists, '	clauses:', len(basic), '	construction time:', cTime, '	solution time:', basTime
+	print('	basic   %-11s solution:' % encoding, basSolExists, '	clauses:', len(basic), '	literals:', literalCount(basic), '	construction time:', cTime, '	solution time:', basTime)
 	if(basSolExists):
-		sud = satToSud(basSol, n)
+		with stats.phase('decode'):
+			sud = encoder.decode(basSol)
 		#printSolution(sud)
 		
-def runSatoku(n):
-	global id
-	global lid
-	id = {}
-	lid = ['']
-	start = time.clock()
-	cnf = satokuCNF(n)
-	cTime = (time.clock() - start)
-	
-	start = time.clock()
+def runSatoku(n, encoding='exponential', symmetry=False, stats=None, grid=None):
+	cnf, cTime = runFormula('satoku', n, encoding, symmetry, stats, grid)
+	stats = stats or noStats
+	encoder = Encoder.layout('satoku', n)
+	
+	stats.begin('solve')
+	start = clock()
 	sol = sat.solve(cnf)
-	basTime = (time.clock() - start)
+	basTime = (clock() - start)
+	stats.end()
 	
 	if type(sol) == type([]):
 		solExists = True
 	else:
 		solExists = False
 	
-	print '	satoku  solution:', solExists, '	clauses:', len(cnf), '	construction time:', cTime, '	solution time:', basTime
+	print('	satoku  %-11s solution:' % encoding, solExists, '	clauses:', len(cnf), '	literals:', literalCount(cnf), '	construction time:', cTime, '	solution time:', basTime)
 	if(solExists):
-		sud = satToSatoku(sol, n)
+		with stats.phase('decode'):
+			sud = encoder.decode(sol)
 		#printSolution(sud)
 	
 		
@@ -289,7 +1054,9 @@ def shiftPrototype(prototype):
 	for i, e in enumerate(prototype):
 		shiftP.append([])
 		for j, f in enumerate(e):
-			shiftP[i].append( f[:-1] + str( int(f[-1]) + shift ) )
+			# the bit number may have more than one digit
+			head, bit = f.rsplit('B', 1)
+			shiftP[i].append( head + 'B' + str( int(bit) + shift ) )
 			
 	return shiftP
 
@@ -304,9 +1071,10 @@ def genNullValuePrototypeCNF(n):
 	else:
 		return genAllPairs(nBits, '')[-nullValueCount:]
 	
-def convertToBase(prototype, base):
+def convertToBase(prototype, base, encoder=None):
 	''' Changes a prototype to pycosat cnf clauses using base + prototype value
 	'''
+	conv = (encoder or defaultEncoder).conv
 	out = []
 	for i, e in enumerate(prototype):
 		out.append([])
@@ -330,13 +1098,7 @@ def hasZero(cnf):
 def intToHandle(values):
 	''' inverse of the conv() function
 	'''
-	handle  =[]
-	for i, e in enumerate(values):
-		if e < 0:
-			handle.append( lid[ abs(e)] + '-')
-		else:
-			handle.append( lid[e] )
-	return handle
+	return defaultEncoder.intToHandle(values)
 
 def clauseToInt(clause):
 	''' converts a cnf clause to an integer
@@ -348,27 +1110,27 @@ def clauseToInt(clause):
 			i += 1
 	return i
 
-def satToSud(solution, n):
-	''' converts the sat solution to a sudoku solution
+def handleKey(handle):
+	''' sort key of a bit handle from intToHandle, cell first then the bit number
 	'''
-	n_sqr = n**2
-	nBits = countBits(n_sqr)
-	
-	handles = intToHandle(solution)
-	if len(handles) % nBits != 0:
-		print 'Invalid Solution: Bit count is wrong'
-		return None
-		
-	sud = []
-	si = -1
-	handles.sort()
-	for i in range(0, len(handles), nBits):
-		if (i) % (nBits*n_sqr) == 0:
-			sud.append([])
-			si += 1
-		sud[si].append(clauseToInt(handles[i:i+nBits]))
-	
-	return sud
+	cell, bit = handle.rstrip('-').rsplit('B', 1)
+	return cell, int(bit)
+
+def legacyEncoder():
+	''' returns the default encoder, raises ValueError when nothing was numbered with it
+
+		the builders number their variables with encoders of their own, so their solutions are
+		decoded by the encoder passed to them (Encoder.decode) or, for the buffers, decode.decode
+	'''
+	if defaultEncoder.lid is not None and len(defaultEncoder.lid) == 1:
+		raise ValueError('the default encoder numbers no variables, build with encoder=Encoder(model, n) '
+			'and call encoder.decode(solution), or decode.decode(model, solution, n) for a buffer')
+	return defaultEncoder
+
+def satToSud(solution, n, nBits=None):
+	''' converts the sat solution to a sudoku solution, see Encoder.satToSud
+	'''
+	return legacyEncoder().satToSud(solution, n, nBits)
 	
 def vector2Int(v, n):
 	nBits = countBits(n)
@@ -378,29 +1140,21 @@ def vector2Int(v, n):
 	
 	
 def satToSatoku(solution, n):
-	''' converts a sat solution from satoku to a Sudoku solution
+	''' converts a sat solution from satoku to a Sudoku solution, see Encoder.satToSatoku
 	'''
-	sud_p = satToSud(solution, n)
-	sud = deepcopy(sud_p)
-	
-	for r, row in enumerate(sud_p):
-		for v, val in enumerate(row):
-			c = vector2Int(sud_p[r][v], n)
-			sud[r][c] = v
-			
-	return sud
+	return legacyEncoder().satToSatoku(solution, n)
 	
 def printSolution(solution):
 	''' prints the solution the the screen
 	'''
 	for row in solution:
-		print row
+		print(row)
 
 if __name__ == '__main__':
 	compare(3)
-	start = time.clock()
-	osud.solve(blank)
-	print time.clock() - start
+	start = clock()
+	osud.solve(blank, symmetry=True)
+	print(clock() - start)
 	
 	
 	
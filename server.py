@@ -0,0 +1,322 @@
+''' Local solving service over a Unix socket or localhost TCP
+
+	Keeps worker processes warm, with numpy, pycosat and the base clauses the default backend
+	uses loaded (see templates.py), so callers do not pay the imports and the clause
+	construction on every puzzle.  Needs Python 3.7 or later.
+
+	The protocol is JSON lines.  A request is an object with the puzzle, as a one-line puzzle
+	string (see solve.py) or a list of rows, and optionally an id, a backend (the one the server
+	was started with, dlx by default), a timeout in seconds and cached:
+
+		{"id": 1, "puzzle": "..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..", "timeout": 5}
+
+	and is answered, not necessarily in order, with its id, the status (solved, unsolvable,
+	invalid, unsupported, timeout or error), the solution in the form of the puzzle and the
+	seconds it spent queued and solving:
+
+		{"id": 1, "status": "solved", "solution": "483921657...", "queued": 0.0001, "seconds": 0.004}
+
+	{"op": "stats"} is answered with the queue depth (queueDepth, requests waiting), the requests
+	in flight, the counts of each status, the workers recycled and the percentiles of the
+	latencies of the last latencyWindow requests.
+
+	Requests wait in a queue of at most queueSize, when it is full the server stops reading
+	from the connections, so a fast client is slowed down by the socket instead of filling the
+	memory.  Each connection also owes at most queueSize answers, a client that does not read
+	them is no longer read itself, while the answers of the others go on.  At most one request
+	per worker is solving at a time.  A request that times out is answered at once, and when
+	its worker is still on the puzzle grace seconds later the worker is killed and replaced.
+
+	python server.py --unix /tmp/satoku.sock --workers 4
+	python server.py --port 7411
+'''
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+import bench
+import pycosatSudoku
+import solve
+import templates
+
+queueSize = 1024 # requests waiting for a worker before the connections are no longer read
+latencyWindow = 10000 # requests the latency percentiles cover
+defaultPort = 7411
+graceSeconds = 1.0 # a timed out request may go on this long before its worker is replaced
+defaultBackend = 'dlx'
+# backend -> the base clauses (encoding, n) each worker builds at start to serve it
+backendTemplates = {
+	'pycosat': ( ('weber', 3), ),
+	'satoku': ( ('satoku', 3), ),
+	'portfolio': ( ('weber', 3), ),
+}
+
+failures = ('invalid', 'unsolvable', 'unsupported')
+
+# workers are replaced while connections are open, a forked one would keep their sockets open
+workerContext = multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+def _warmWorker(warm):
+	# imported here as satoku imports pycosatSudoku, it registers the satoku templates
+	import satoku
+	for encoding, n in warm:
+		templates.getTemplate(encoding, n)
+
+def _solveRequest(line, backend, cached):
+	return solve.solveLine(line, backend, cached)
+
+def _settle(future, result, error):
+	# the outcome of a worker job, on the event loop
+	if future.done():
+		return
+	if error is not None:
+		future.set_exception(error)
+	else:
+		future.set_result(result)
+
+class Server(object):
+	''' the queue, the dispatchers and the worker processes behind the sockets
+
+		each dispatcher has a worker of its own, a single process pool, so it can kill and
+		replace it without touching the requests of the others
+	'''
+	def __init__(self, workers=None, queueSize=queueSize, timeout=None, warm=None, backend=defaultBackend, grace=graceSeconds):
+		self.workers = workers or os.cpu_count() or 1
+		self.timeout = timeout # default per request timeout, None for none
+		self.backend = backend # backend of the requests that name none
+		self.warm = backendTemplates.get(backend, ()) if warm is None else warm
+		self.grace = grace
+		self.queueSize = queueSize
+		self.counts = collections.Counter()
+		self.latencies = collections.deque(maxlen=latencyWindow)
+		self.inFlight = 0
+		self.recycled = 0
+		self.started = time.perf_counter()
+
+	async def start(self):
+		''' starts and warms every worker and starts the dispatchers
+		'''
+		self.loop = asyncio.get_event_loop()
+		self.queue = asyncio.Queue(self.queueSize)
+		self.pools = await asyncio.gather( *[ self.startWorker() for i in range(self.workers) ] )
+		self.dispatchers = [ self.loop.create_task(self.dispatch(i)) for i in range(self.workers) ]
+
+	async def startWorker(self):
+		''' returns a new worker, once _warmWorker has run in it
+		'''
+		pool = workerContext.Pool(1, _warmWorker, (self.warm,))
+		await self.submit(pool, os.getpid)
+		return pool
+
+	def submit(self, pool, function, *args):
+		''' runs function(*args) on the worker pool, returns an asyncio future of its result
+		'''
+		future = self.loop.create_future()
+		pool.apply_async(function, args,
+			callback=lambda result: self.loop.call_soon_threadsafe(_settle, future, result, None),
+			error_callback=lambda error: self.loop.call_soon_threadsafe(_settle, future, None, error))
+		return future
+
+	def close(self):
+		for task in self.dispatchers:
+			task.cancel()
+		for pool in self.pools:
+			pool.terminate()
+
+	def stats(self):
+		''' returns the figures answered to {"op": "stats"}
+		'''
+		out = {
+			'queueDepth': self.queue.qsize(), 'queueSize': self.queueSize,
+			'inFlight': self.inFlight, 'workers': self.workers, 'recycled': self.recycled,
+			'uptime': time.perf_counter() - self.started, 'counts': dict(self.counts),
+		}
+		if self.latencies:
+			out['latency'] = bench.summarize(list(self.latencies))
+		return out
+
+	def parse(self, text):
+		''' returns the job of a request line, or its answer when there is nothing to solve
+		'''
+		try:
+			request = json.loads(text)
+			if not isinstance(request, dict):
+				raise ValueError('a request is a JSON object')
+		except ValueError as e:
+			return None, {'status': 'error', 'error': str(e)}
+		answer = {'id': request.get('id')}
+		if request.get('op') == 'stats':
+			answer.update(self.stats())
+			return None, answer
+		backend = request.get('backend', self.backend)
+		if backend not in pycosatSudoku.backends:
+			answer.update(status='error', error='unknown backend %r' % (backend,))
+			return None, answer
+		puzzle = request.get('puzzle')
+		if isinstance(puzzle, list):
+			asRows = True
+			try:
+				line = bench.formatPuzzle(puzzle, ',')
+			except (TypeError, ValueError):
+				line = ''
+		else:
+			asRows = False
+			line = str(puzzle or '')
+		timeout = request.get('timeout', self.timeout)
+		return (answer, line, asRows, backend, bool(request.get('cached')), timeout, time.perf_counter()), None
+
+	async def dispatch(self, index):
+		# one dispatcher per worker, a timed out job keeps its dispatcher for at most grace seconds
+		while True:
+			job, respond = await self.queue.get()
+			answer, line, asRows, backend, cached, timeout, received = job
+			self.inFlight += 1
+			answer['queued'] = time.perf_counter() - received
+			future = self.submit(self.pools[index], _solveRequest, line, backend, cached)
+			try:
+				solution, seconds = await asyncio.wait_for(asyncio.shield(future), timeout)
+				if solution in failures:
+					answer['status'] = solution
+				else:
+					answer['status'] = 'solved'
+					answer['solution'] = bench.parsePuzzle(solution) if asRows else solution
+				answer['seconds'] = seconds
+			except asyncio.TimeoutError:
+				answer['status'] = 'timeout'
+			except Exception as e:
+				answer.update(status='error', error='%s: %s' % (type(e).__name__, e))
+			self.counts[answer['status']] += 1
+			self.latencies.append(time.perf_counter() - received)
+			respond(answer)
+			if not future.done():
+				await asyncio.wait([future], timeout=self.grace)
+			if not future.done():
+				# terminate joins the pool threads, which takes a moment
+				await self.loop.run_in_executor(None, self.pools[index].terminate)
+				self.pools[index] = await self.startWorker()
+				self.recycled += 1
+			self.inFlight -= 1
+
+	async def handle(self, reader, writer):
+		''' serves one connection until it closes
+
+			the answers go through outbox to a task of their own, so a client that does not
+			read them holds up neither the dispatchers nor the other connections
+		'''
+		outbox = asyncio.Queue()
+		owed = asyncio.Semaphore(self.queueSize) # answers not written yet
+		pending = set()
+
+		async def send():
+			broken = False
+			while True:
+				answer = await outbox.get()
+				if answer is None:
+					return
+				if not broken:
+					try:
+						writer.write( (json.dumps(answer) + '\n').encode('utf8') )
+						await writer.drain()
+					except ConnectionError:
+						broken = True
+				owed.release()
+
+		sender = self.loop.create_task(send())
+		try:
+			while True:
+				text = await reader.readline()
+				if not text:
+					break
+				text = text.strip()
+				if not text:
+					continue
+				# waits here while queueSize answers are owed, which stops reading the socket
+				await owed.acquire()
+				job, answer = self.parse(text.decode('utf8', 'replace'))
+				if job is None:
+					outbox.put_nowait(answer)
+					continue
+				done = self.loop.create_future()
+				def respond(answer, done=done):
+					outbox.put_nowait(answer)
+					done.set_result(None)
+				pending.add(done)
+				done.add_done_callback(pending.discard)
+				# waits here while the queue is full, which stops reading the socket
+				await self.queue.put( (job, respond) )
+			if pending:
+				await asyncio.wait(list(pending))
+			outbox.put_nowait(None)
+			await sender
+		except ConnectionError:
+			pass
+		finally:
+			sender.cancel()
+			writer.close()
+
+async def serve(path=None, host='127.0.0.1', port=defaultPort, workers=None, timeout=None, queueSize=queueSize, warm=None, ready=None, backend=defaultBackend, grace=graceSeconds):
+	''' runs the service on the Unix socket path, or on host:port, until cancelled
+		ready, when given, is called with the listening asyncio server, warm defaults to the
+		backendTemplates of backend
+	'''
+	service = Server(workers, queueSize, timeout, warm, backend, grace)
+	await service.start()
+	if path is not None:
+		if os.path.exists(path):
+			os.remove(path)
+		listener = await asyncio.start_unix_server(service.handle, path)
+	else:
+		listener = await asyncio.start_server(service.handle, host, port)
+	if ready is not None:
+		ready(listener)
+	try:
+		async with listener:
+			await listener.serve_forever()
+	finally:
+		service.close()
+		if path is not None and os.path.exists(path):
+			os.remove(path)
+
+def request(messages, path=None, host='127.0.0.1', port=defaultPort):
+	''' sends request objects to a running service and returns the answers, in the order they came
+	'''
+	if path is not None:
+		sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		sock.connect(path)
+	else:
+		sock = socket.create_connection( (host, port) )
+	try:
+		sock.sendall( b''.join( (json.dumps(m) + '\n').encode('utf8') for m in messages ) )
+		sock.shutdown(socket.SHUT_WR)
+		stream = sock.makefile('rb')
+		return [ json.loads(line) for line in stream if line.strip() ]
+	finally:
+		sock.close()
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='serve sudoku solving over a local socket, JSON lines')
+	parser.add_argument('--unix', help='Unix socket path, instead of TCP')
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=defaultPort)
+	parser.add_argument('--workers', type=int, help='worker processes, defaults to the number of CPUs')
+	parser.add_argument('--queue', type=int, default=queueSize, help='requests waiting before the connections are no longer read')
+	parser.add_argument('--timeout', type=float, help='default per request timeout in seconds')
+	parser.add_argument('--grace', type=float, default=graceSeconds, help='seconds a timed out request may go on before its worker is replaced')
+	parser.add_argument('--backend', default=defaultBackend, choices=sorted(pycosatSudoku.backends), help='backend of the requests that name none, the workers are warmed for it')
+	args = parser.parse_args(argv)
+
+	where = args.unix or '%s:%d' % (args.host, args.port)
+	try:
+		asyncio.run(serve(args.unix, args.host, args.port, args.workers, args.timeout, args.queue,
+			ready=lambda listener: print('serving on %s' % where, file=sys.stderr), backend=args.backend, grace=args.grace))
+	except KeyboardInterrupt:
+		pass
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,104 @@
+''' Given-aware simplification of a cnf formula before it is handed to pycosat
+
+	The givens of a puzzle are unit clauses.  Instead of passing them to the solver with the
+	rest of the formula they are propagated here: satisfied clauses are dropped, falsified
+	literals removed and any clause left with one literal is propagated in turn.  The variables
+	that remain are renumbered 1..k so pycosat only sees the open part of the puzzle, and
+	expandModel() maps its solution back to the original variables.
+'''
+import numpy as np
+
+def buildIndex(clauses):
+	''' returns the flat literal array of clauses, the clause of each literal and the clause starts
+
+		building it is the expensive part of reduceCNF, when the same base clauses are
+		reduced for many puzzles build it once and pass it in
+	'''
+	lengths = np.array([len(clause) for clause in clauses], dtype=np.int64)
+	lits = np.fromiter( (l for clause in clauses for l in clause), dtype=np.int64, count=lengths.sum() )
+	clauseOf = np.repeat(np.arange(len(clauses)), lengths)
+	starts = np.zeros(len(clauses), dtype=np.int64)
+	starts[1:] = np.cumsum(lengths)[:-1]
+	return lits, clauseOf, starts
+
+def propagate(units, index):
+	''' unit propagates units through the clauses of index
+
+		returns the variable states, +1 true, -1 false and 0 open, and the state of every
+		literal, or None if the units conflict
+		each round assigns every literal left alone in an open clause at once
+	'''
+	lits, clauseOf, starts = index
+	var = np.abs(lits)
+	sign = np.sign(lits).astype(np.int8)
+	
+	units = np.asarray(units, dtype=np.int64)
+	# units may fix variables no clause mentions
+	top = max(var.max() if len(lits) else 0, np.abs(units).max() if len(units) else 0)
+	state = np.zeros(top + 1, dtype=np.int8)
+	state[np.abs(units)] = np.sign(units)
+	if len(units) and (state[np.abs(units)] != np.sign(units)).any():
+		return None
+		
+	while True:
+		litState = state[var]*sign
+		if not len(lits):
+			return state, litState
+		satisfied = np.maximum.reduceat(litState, starts) == 1
+		nOpen = np.add.reduceat(litState == 0, starts)
+		if (~satisfied & (nOpen == 0)).any():
+			return None
+		unit = ~satisfied & (nOpen == 1)
+		if not unit.any():
+			return state, litState
+		# two clauses forcing opposite literals leave one of them false for the next round
+		forced = lits[(litState == 0) & unit[clauseOf]]
+		state[np.abs(forced)] = np.sign(forced)
+
+def reduceCNF(clauses, units, index=None):
+	''' removes the fixed part of clauses under the unit literals units
+
+		returns (cnf, names, value) where cnf uses the compact variables 1..len(names)-1,
+		names[k] is the original variable of compact variable k and value maps the fixed
+		variables to True / False, or None if the units make the formula unsatisfiable
+		index may be a prebuilt buildIndex(clauses) to share between calls
+	'''
+	if index is None:
+		index = buildIndex(clauses)
+	lits, clauseOf, starts = index
+	
+	propagated = propagate(units, index)
+	if propagated is None:
+		return None
+	state, litState = propagated
+	
+	satisfied = np.zeros(len(clauses), dtype=bool)
+	satisfied[clauseOf[litState == 1]] = True
+	keep = (litState == 0) & ~satisfied[clauseOf]
+	kept = lits[keep]
+	
+	# renumber the open variables 1..k
+	names, compact = np.unique(np.abs(kept), return_inverse=True)
+	compact = (np.sign(kept) * (compact + 1)).tolist()
+	lengths = np.bincount(clauseOf[keep], minlength=len(clauses))
+	ends = np.cumsum(lengths[lengths > 0]).tolist()
+	
+	cnf = []
+	start = 0
+	for end in ends:
+		cnf.append(compact[start:end])
+		start = end
+		
+	fixed = np.flatnonzero(state)
+	value = dict( zip(fixed.tolist(), (state[fixed] > 0).tolist()) )
+	return cnf, [0] + names.tolist(), value
+
+def expandModel(model, names, value):
+	''' maps a pycosat model of a reduced formula back to the original variables
+
+		returns the true and false literals of every fixed and every remaining variable
+	'''
+	out = [ v if value[v] else -v for v in value ]
+	for l in model:
+		out.append( names[l] if l > 0 else -names[-l] )
+	return sorted(out, key=abs)
@@ -0,0 +1,133 @@
+''' Batch constraint propagation with naked and hidden singles
+
+	A batch of puzzles of one order is held as a (B, n**2, n**2, n**2) boolean candidate tensor,
+	cands[b, row, col, digit - 1] telling whether digit is still possible in a cell of puzzle b.
+	Each round applies to the whole batch at once, with array operations:
+
+		naked singles    a cell with one candidate left removes it from its row, column and box
+		hidden singles   a digit with one place left in a row, column or box is placed there
+
+	until no candidate is removed.  A cell without candidates or a digit without a place in a
+	unit marks the puzzle unsolvable.  Easy puzzles are solved by propagation alone and never
+	reach a SAT solver, the others go to one with the forced cells as extra givens, which the
+	clause builders turn into unit clauses.
+
+	filled, status = propagateBatch(grids)   # status SOLVED, OPEN or UNSOLVABLE per puzzle
+	solutions = solveBatch(grids, backend='pycosat')
+'''
+import numpy as np
+
+import bench
+import pycosatSudoku
+
+SOLVED, OPEN, UNSOLVABLE = 1, 0, -1
+
+def candidateMasks(grids):
+	''' returns the candidate tensor of a batch of puzzles (0 for blank, values 1..n**2)
+	'''
+	G = np.asarray(grids, dtype=np.int64)
+	N = G.shape[-1]
+	digits = np.arange(1, N + 1)
+	return (G[..., None] == digits) | (G[..., None] == 0)
+
+def boxView(cands, n):
+	''' returns cands as [puzzle, band, row in band, stack, column in stack, digit]
+	'''
+	B, N = cands.shape[:2]
+	return cands.reshape(B, n, n, n, n, N)
+
+def unitCounts(cands, n):
+	''' returns the counts of cands over each row, column and box, as [puzzle, unit, digit]
+	'''
+	box = boxView(cands, n).sum(axis=(2, 4), dtype=np.int64) # [puzzle, band, stack, digit]
+	return cands.sum(axis=2, dtype=np.int64), cands.sum(axis=1, dtype=np.int64), box.reshape(box.shape[0], -1, box.shape[-1])
+
+def spread(rows, cols, boxes, n):
+	''' returns the [puzzle, row, col, digit] array of each cell's row, column and box figures
+	'''
+	B, N = rows.shape[:2]
+	box = boxes.reshape(B, n, 1, n, 1, N)
+	return rows[:, :, None, :], cols[:, None, :, :], np.broadcast_to(box, (B, n, n, n, n, N)).reshape(B, N, N, N)
+
+def eliminate(cands, n, maxRounds=None):
+	''' applies naked and hidden singles to cands in place until nothing changes
+
+		returns the number of rounds and a boolean per puzzle telling which are unsolvable
+	'''
+	B = len(cands)
+	dead = np.zeros(B, dtype=bool)
+	live = np.ones(B, dtype=bool) # puzzles that changed in the last round
+	rounds = 0
+	while live.any() and (maxRounds is None or rounds < maxRounds):
+		rounds += 1
+		C = cands[live]
+		before = C.sum(axis=(1, 2, 3))
+
+		#naked singles, a cell's only candidate is taken out of its peers
+		single = C & (C.sum(axis=3, keepdims=True) == 1)
+		rows, cols, boxes = spread(*(unitCounts(single, n) + (n,)))
+		placed = (rows > 0) | (cols > 0) | (boxes > 0)
+		C &= ~placed | single
+		clash = ( (rows > 1) | (cols > 1) | (boxes > 1) ).any(axis=(1, 2, 3))
+
+		#hidden singles, a digit with one place in a unit goes there
+		rows, cols, boxes = spread(*(unitCounts(C, n) + (n,)))
+		hidden = C & ( (rows == 1) | (cols == 1) | (boxes == 1) )
+		forced = hidden.any(axis=3, keepdims=True)
+		C[:] = np.where(forced, hidden, C)
+		clash |= (hidden.sum(axis=3) > 1).any(axis=(1, 2))
+
+		#a cell without candidates or a digit without a place
+		clash |= ~C.any(axis=3).all(axis=(1, 2))
+		clash |= ( (rows == 0) | (cols == 0) | (boxes == 0) ).any(axis=(1, 2, 3))
+		cands[live] = C
+		index = np.nonzero(live)[0]
+		dead[index[clash]] = True
+		live[index[clash | (C.sum(axis=(1, 2, 3)) == before)]] = False
+	return rounds, dead
+
+def propagateBatch(grids, maxRounds=None):
+	''' propagates a batch of puzzles of one order
+
+		returns the grids filled in with the forced cells (0 for the open ones) and the status
+		of each, SOLVED, OPEN or UNSOLVABLE
+	'''
+	cands = candidateMasks(grids)
+	n = bench.orderOf(grids[0])
+	rounds, dead = eliminate(cands, n, maxRounds)
+	counts = cands.sum(axis=3)
+	filled = np.where(counts == 1, cands.argmax(axis=3) + 1, 0)
+	# a grid of singles is only solved when every unit holds each digit once, which maxRounds may
+	# have stopped short of checking
+	complete = (counts == 1).all(axis=(1, 2))
+	for unit in unitCounts(cands, n):
+		complete &= (unit == 1).all(axis=(1, 2))
+	status = np.where(complete, SOLVED, OPEN)
+	status[dead] = UNSOLVABLE
+	filled[dead] = 0
+	return filled, status
+
+def solveBatch(grids, backend='pycosat', cached=False, stats=None):
+	''' returns the solved grids of a batch of puzzles of one order, None for the unsolvable ones
+
+		only the puzzles propagation leaves open go to pycosatSudoku.solve_grid, with their forced
+		cells as givens.  stats, a dict, gets the counts of each outcome
+	'''
+	if not len(grids):
+		return []
+	filled, status = propagateBatch(grids)
+	out = []
+	for grid, state in zip(filled.tolist(), status):
+		if state == SOLVED:
+			out.append(grid)
+		elif state == UNSOLVABLE:
+			out.append(None)
+		else:
+			out.append(pycosatSudoku.solve_grid(grid, backend=backend, cached=cached))
+	if stats is not None:
+		stats.update({
+			'propagated': int((status == SOLVED).sum()),
+			'unsolvable': int((status == UNSOLVABLE).sum()),
+			'sat': int((status == OPEN).sum()),
+		})
+	return out
@@ -0,0 +1,93 @@
+''' Cache of solutions keyed on the canonical form of the puzzle
+
+	A puzzle is canonicalized (see canonical.py) and the canonical puzzle is what gets solved,
+	so its solution can be stored as is and handed back to any equivalent puzzle through the
+	inverse of that puzzle's transform.  Solutions are kept in an in-memory LRU and, when a
+	cache path is set, in an sqlite file shared between processes and runs.
+
+	solved = solveCached(grid, solver)   # solver(grid) returns a solved grid or None
+'''
+import os
+import sqlite3
+
+from collections import OrderedDict
+
+import canonical
+
+maxSolutions = 1 << 16 # size of the in-memory LRU
+cachePath = os.environ.get('SATOKU_SOLUTION_CACHE') # sqlite file, None disables the on-disk cache
+
+stats = {'hits': 0, 'diskHits': 0, 'misses': 0}
+
+_solutions = OrderedDict()
+_db = {} # (pid, path) -> connection, a connection must not cross a fork
+_missing = object()
+_unsolvable = '' # stored for puzzles without a solution
+
+def setCachePath(path):
+	''' sets the sqlite file for on-disk solutions, None disables it
+	'''
+	global cachePath
+	cachePath = path
+
+def clear():
+	''' empties the in-memory LRU and the statistics, on-disk solutions are left alone
+	'''
+	_solutions.clear()
+	for name in stats:
+		stats[name] = 0
+
+def _connection():
+	key = (os.getpid(), cachePath)
+	if key not in _db:
+		db = sqlite3.connect(cachePath, timeout=30)
+		db.execute('create table if not exists solutions (puzzle text primary key, solution text)')
+		db.commit()
+		_db[key] = db
+	return _db[key]
+
+def _remember(key, solution):
+	_solutions[key] = solution
+	while len(_solutions) > maxSolutions:
+		_solutions.popitem(last=False)
+
+def lookup(key):
+	''' returns the stored solution text of a canonical key, or _missing
+	'''
+	solution = _solutions.pop(key, _missing)
+	if solution is not _missing:
+		stats['hits'] += 1
+	elif cachePath is not None:
+		row = _connection().execute('select solution from solutions where puzzle = ?', (key,)).fetchone()
+		if row is not None:
+			solution = row[0]
+			stats['diskHits'] += 1
+	if solution is not _missing:
+		_remember(key, solution)
+	return solution
+
+def store(key, solution):
+	''' stores the solution text of a canonical key
+	'''
+	_remember(key, solution)
+	if cachePath is not None:
+		db = _connection()
+		db.execute('insert or replace into solutions values (?, ?)', (key, solution))
+		db.commit()
+
+def solveCached(grid, solver):
+	''' returns solver's solution of grid, or of an equivalent puzzle solved before, or None
+	'''
+	canon, transform = canonical.canonicalize(grid)
+	key = canonical.key(canon)
+	n_sqr = len(canon)
+	solution = lookup(key)
+	if solution is _missing:
+		stats['misses'] += 1
+		solved = solver(canon)
+		solution = _unsolvable if solved is None else canonical.key(solved)
+		store(key, solution)
+	if solution == _unsolvable:
+		return None
+	values = [ int(v) for v in solution.split(',') ]
+	return canonical.inverse(transform, [ values[r*n_sqr:(r + 1)*n_sqr] for r in range(n_sqr) ])
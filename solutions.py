@@ -0,0 +1,64 @@
+''' Enumerating and counting the solutions of a grid
+
+	Every solution is blocked on the cell variables only (see decode.cellVariables), so two
+	models that differ in auxiliary variables alone count as one grid.  When a formula has no
+	auxiliary variables that is exactly what pycosat.itersolve does, otherwise the formula is
+	solved again with the projected blocking clauses added.  The dlx backend counts natively.
+
+	countSolutions(grid) == 1 checks that a puzzle is unique, stopping at the second solution.
+'''
+import pycosat
+
+import decode
+import dlx
+import registry
+
+def iterModels(clauses, nProject):
+	''' yields the models of clauses that differ on variables 1..nProject
+	'''
+	nVars = max( abs(l) for clause in clauses for l in clause ) if clauses else 0
+	if nVars <= nProject:
+		for model in pycosat.itersolve(clauses):
+			yield model
+		return
+
+	blocking = []
+	while True:
+		model = pycosat.solve(clauses + blocking)
+		if model == 'UNSAT':
+			return
+		yield model
+		blocking.append( [ -l for l in model if abs(l) <= nProject ] )
+
+def iterSolutions(grid, encoding='weber', limit=None):
+	''' yields the solved grids of grid, at most limit of them, encoding is one of
+		registry.encodings
+	'''
+	if limit is not None and limit <= 0:
+		return
+	if encoding == 'dlx':
+		cover = dlx.sudokuCover(grid)
+		if cover is None:
+			return
+		n = registry.orderOf(grid)
+		for rows in cover.search(limit):
+			yield dlx.readSolution(n, rows)
+		return
+
+	build, decodeModel, orders = registry.encodings[encoding]
+	n = registry.orderOf(grid)
+	if orders is not None and n not in orders:
+		raise ValueError('%s does not support order %d' % (encoding, n))
+	models = iterModels(build(grid), decode.cellVariables(encoding, n))
+	for i, model in enumerate(models):
+		yield [ list(map(int, row)) for row in decodeModel(model, grid) ]
+		if limit is not None and i + 1 == limit:
+			return
+
+def countSolutions(grid, limit=2, encoding='weber'):
+	''' returns the number of solutions of grid, counting no further than limit
+	'''
+	return sum( 1 for solved in iterSolutions(grid, encoding, limit) )
+
+def isUnique(grid, encoding='weber'):
+	return countSolutions(grid, 2, encoding) == 1
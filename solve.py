@@ -0,0 +1,249 @@
+''' Command line solver for files of one-line puzzles
+
+	Reads puzzles one per line, 81 characters for 9x9 with '.' or '0' for blanks, or comma /
+	space separated numbers for any order (see bench.parsePuzzle), from a file or stdin.  Blank
+	and '#' comment lines are skipped.  Files are memory-mapped and split into lines without
+	reading them whole, and puzzles go to a pool of worker processes at most a few batches
+	ahead of the output, so corpora of millions of lines stream through in constant memory.
+
+	With --propagate each batch is first run through the naked and hidden singles of
+	singles.py, puzzles solved that way skip the backend and the others reach it with the
+	forced cells filled in, the propagation time is shared out over the batch.
+
+	Each solution is written on its own line in the format of its puzzle, followed by the
+	seconds it took; 'unsolvable', 'invalid' or 'unsupported' (an order the backend can not
+	solve) take the place of the solution when there is none.  A summary of the timings goes
+	to stderr.
+
+	python solve.py puzzles.txt --backend dlx --workers 4 > solutions.txt
+'''
+from __future__ import print_function
+
+import argparse
+import array
+import itertools
+import mmap
+import multiprocessing
+import sys
+import threading
+
+try:
+	import queue
+except ImportError:
+	import Queue as queue
+
+import bench
+import pycosatSudoku
+import singles
+
+from buildstats import clock
+
+batchSize = 1 << 12 # lines read, and propagated, at a time
+window = 2 # batches handed to the pool ahead of the output
+backendOrders = {'pycosat': (3,)} # orders a backend is limited to
+
+def iterFileLines(path):
+	''' yields the lines of a file as bytes through a memory map
+	'''
+	with open(path, 'rb') as f:
+		try:
+			data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:
+			# an empty file can not be mapped
+			return
+		try:
+			start = 0
+			size = len(data)
+			while start < size:
+				end = data.find(b'\n', start)
+				if end < 0:
+					end = size
+				yield data[start:end]
+				start = end + 1
+		finally:
+			data.close()
+
+def iterPuzzleLines(path=None):
+	''' yields the puzzle lines of path, or stdin for None or '-', as stripped strings
+	'''
+	if path is None or path == '-':
+		stream = getattr(sys.stdin, 'buffer', sys.stdin)
+		lines = iter(stream.readline, b'')
+	else:
+		lines = iterFileLines(path)
+	for line in lines:
+		line = line.strip().decode('ascii', 'replace') if isinstance(line, bytes) else line.strip()
+		if line and not line.startswith('#'):
+			yield line
+
+def separator(line):
+	# the delimiter of a puzzle line, None for the one character per cell form
+	for sep in (',', ' ', '\t'):
+		if sep in line:
+			return sep
+	return None
+
+def parseLine(line):
+	''' returns the grid of a puzzle line, or None when it is not a valid puzzle
+	'''
+	try:
+		grid = bench.parsePuzzle(line.replace('\t', ' '))
+	except ValueError:
+		return None
+	n_sqr = len(grid)
+	n = bench.orderOf(grid)
+	if n < 1 or n**2 != n_sqr or any( len(row) != n_sqr or not all(0 <= val <= n_sqr for val in row) for row in grid ):
+		return None
+	return grid
+
+def solveLine(line, backend='dlx', cached=False):
+	''' returns (solution line, seconds) for a puzzle line
+	'''
+	start = clock()
+	grid = parseLine(line)
+	if grid is None:
+		return 'invalid', clock() - start
+	if bench.orderOf(grid) not in backendOrders.get(backend, (bench.orderOf(grid),)):
+		return 'unsupported', clock() - start
+	solved = pycosatSudoku.solve_grid(grid, backend=backend, cached=cached)
+	if solved is None:
+		return 'unsolvable', clock() - start
+	sep = separator(line)
+	return bench.formatPuzzle(solved, sep), clock() - start
+
+def _solveChunk(jobs):
+	return [ solveLine(*job) for job in jobs ]
+
+def batches(items, size):
+	batch = []
+	for item in items:
+		batch.append(item)
+		if len(batch) == size:
+			yield batch
+			batch = []
+	if batch:
+		yield batch
+
+def propagateLines(lines):
+	''' runs a batch of puzzle lines through singles.propagateBatch
+
+		returns a list with the (solution line, seconds) of each line propagation settles and
+		the line with its forced cells filled in for the others, and the seconds per line
+	'''
+	start = clock()
+	out = list(lines)
+	grids = [ parseLine(line) for line in lines ]
+	byOrder = {}
+	for i, grid in enumerate(grids):
+		if grid is not None:
+			byOrder.setdefault(len(grid), []).append(i)
+	for index in byOrder.values():
+		filled, status = singles.propagateBatch([ grids[i] for i in index ])
+		for i, grid, state in zip(index, filled.tolist(), status):
+			sep = separator(lines[i])
+			if state == singles.SOLVED:
+				out[i] = (bench.formatPuzzle(grid, sep), None)
+			elif state == singles.UNSOLVABLE:
+				out[i] = ('unsolvable', None)
+			else:
+				out[i] = bench.formatPuzzle(grid, sep)
+	share = (clock() - start) / max(len(lines), 1)
+	return [ (item[0], share) if isinstance(item, tuple) else item for item in out ], share
+
+def solveLines(lines, backend='dlx', workers=None, chunksize=64, cached=False, propagate=False):
+	''' yields (solution line, seconds) for each puzzle line in order
+
+		workers=1 solves in this process, otherwise on a pool of workers (all CPUs by default).
+		Lines are read batchSize at a time, and propagate settles what it can of each batch
+		with propagateLines first.  The pool is fed by one imap over the batches, up to window
+		of them ahead of the output, so it never waits on a batch boundary.  The portfolio
+		backend always solves in this process, as the pool workers can not start its racing
+		processes (see portfolio.py).
+	'''
+	if workers == 1 or backend == 'portfolio':
+		for batch in batches(lines, batchSize):
+			items, share = propagateLines(batch) if propagate else (batch, 0.0)
+			for item in items:
+				if isinstance(item, tuple):
+					yield item
+				else:
+					solution, seconds = solveLine(item, backend, cached)
+					yield solution, seconds + share
+		return
+
+	# the pool reads jobs from another thread, the batches it has taken are put on plan for
+	# this one, and permits stops it getting more than window batches ahead
+	permits = threading.Semaphore(window)
+	plan = queue.Queue()
+	stopped = threading.Event()
+	def jobs():
+		try:
+			for batch in batches(lines, batchSize):
+				permits.acquire()
+				if stopped.is_set():
+					return
+				items, share = propagateLines(batch) if propagate else (batch, 0.0)
+				plan.put( (items, share) )
+				todo = [ (item, backend, cached) for item in items if not isinstance(item, tuple) ]
+				for start in range(0, len(todo), chunksize):
+					yield todo[start:start + chunksize]
+		finally:
+			plan.put(None)
+
+	pool = multiprocessing.Pool(workers, initializer=pycosatSudoku._init_worker)
+	try:
+		results = pool.imap(_solveChunk, jobs())
+		solved = itertools.chain.from_iterable(results)
+		for items, share in iter(plan.get, None):
+			for item in items:
+				if isinstance(item, tuple):
+					yield item
+				else:
+					solution, seconds = next(solved)
+					yield solution, seconds + share
+			permits.release()
+		# raises what stopped the jobs early, if anything did
+		for rest in results:
+			pass
+		pool.close()
+	finally:
+		# wakes the job thread if it waits for a permit, terminate waits for it
+		stopped.set()
+		permits.release()
+		pool.terminate()
+		pool.join()
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='solve one-line sudoku puzzles')
+	parser.add_argument('input', nargs='?', default='-', help="puzzle file, '-' for stdin")
+	parser.add_argument('-o', '--output', help='solution file, stdout by default')
+	parser.add_argument('--backend', default='dlx', choices=sorted(pycosatSudoku.backends), help='pycosat (Weber clauses) is 9x9 only')
+	parser.add_argument('--workers', type=int, help='worker processes, defaults to the number of CPUs')
+	parser.add_argument('--cache', action='store_true', help='solve equivalent puzzles once, see solutioncache.py')
+	parser.add_argument('--propagate', action='store_true', help='settle easy puzzles with naked and hidden singles first, see singles.py')
+	parser.add_argument('--no-timings', dest='timings', action='store_false', help='leave the seconds off each line')
+	args = parser.parse_args(argv)
+
+	out = open(args.output, 'w') if args.output else sys.stdout
+	times = array.array('d') # 8 bytes a puzzle
+	failed = 0
+	start = clock()
+	try:
+		for solution, seconds in solveLines(iterPuzzleLines(args.input), args.backend, args.workers, cached=args.cache, propagate=args.propagate):
+			times.append(seconds)
+			failed += solution in ('invalid', 'unsolvable', 'unsupported')
+			out.write( (solution + '\t%.6f\n' % seconds) if args.timings else solution + '\n' )
+	finally:
+		if out is not sys.stdout:
+			out.close()
+		else:
+			out.flush()
+
+	wall = clock() - start
+	if times:
+		summary = bench.summarize(times)
+		print('%d puzzles, %d without a solution, %.3f s wall, %.1f puzzles/s, per puzzle median %.6f p90 %.6f p99 %.6f max %.6f' %
+			(len(times), failed, wall, len(times) / wall, summary['median'], summary['p90'], summary['p99'], summary['max']), file=sys.stderr)
+
+if __name__ == '__main__':
+	main()
@@ -1,6 +1,11 @@
+from __future__ import print_function
+
 import pycosat
 import math
-import time
+
+import symbreak
+
+from buildstats import clock
 
 n = 3
 
@@ -14,59 +19,241 @@ def vp(c):
 	d = (c - i * n**4 - j*n**2) 
 	return (i+1, j+1, d+1)
 	
-def uniqueValueCNF():
+auxVar = 0 # last auxiliary variable handed out, auxiliaries are numbered above v(n**2, n**2, n**2)
+
+def newVar():
+	global auxVar
+	auxVar = max(auxVar, n**6) + 1
+	return auxVar
+
+def resetAux():
+	global auxVar
+	auxVar = n**6
+
+def amoPairwise(lits):
+	# one binary clause per pair, no auxiliaries
+	for a in range(len(lits)):
+		for b in range(a+1, len(lits)):
+			yield [ -lits[a], -lits[b] ]
+
+def amoSequential(lits):
+	# sequential counter (Sinz 2005), s[a] is true once one of lits[0..a] is
+	k = len(lits)
+	if k < 2:
+		return
+	s = [ newVar() for a in range(k-1) ]
+	yield [ -lits[0], s[0] ]
+	for a in range(1, k-1):
+		yield [ -lits[a], s[a] ]
+		yield [ -s[a-1], s[a] ]
+		yield [ -lits[a], -s[a-1] ]
+	yield [ -lits[k-1], -s[k-2] ]
+
+def amoCommander(lits, groupSize=3):
+	# commander encoding (Klieber and Kwon 2007), one commander per group of lits
+	if len(lits) <= groupSize + 1:
+		for clause in amoPairwise(lits):
+			yield clause
+		return
+	commanders = []
+	for g in range(0, len(lits), groupSize):
+		group = lits[g:g+groupSize]
+		c = newVar()
+		commanders.append(c)
+		for clause in amoPairwise(group):
+			yield clause
+		for l in group:
+			yield [ -l, c ]
+	for clause in amoCommander(commanders, groupSize):
+		yield clause
+
+def amoProduct(lits):
+	# 2-product encoding (Chen 2010), lits laid out on a p x q grid of row and column variables
+	k = len(lits)
+	if k <= 4:
+		for clause in amoPairwise(lits):
+			yield clause
+		return
+	p = int(math.ceil(math.sqrt(k)))
+	q = int(math.ceil(k / float(p)))
+	rows = [ newVar() for a in range(p) ]
+	cols = [ newVar() for b in range(q) ]
+	for a, l in enumerate(lits):
+		yield [ -l, rows[a // q] ]
+		yield [ -l, cols[a % q] ]
+	for clause in amoProduct(rows):
+		yield clause
+	for clause in amoProduct(cols):
+		yield clause
+
+amoEncodings = {'pairwise': amoPairwise, 'sequential': amoSequential, 'commander': amoCommander, 'product': amoProduct}
+
+def atMostOne(lits, amo='pairwise'):
+	return amoEncodings[amo](lits)
+
+def amoCounts(k, amo='pairwise', groupSize=3):
+	''' returns the (auxiliary variable, clause) counts of an at-most-one over k literals
+	'''
+	if amo == 'pairwise' or (amo == 'commander' and k <= groupSize + 1) or (amo == 'product' and k <= 4):
+		return 0, k*(k - 1) // 2
+	if amo == 'sequential':
+		return max(k - 1, 0), max(3*k - 4, 0)
+	if amo == 'commander':
+		groups = [ min(groupSize, k - g) for g in range(0, k, groupSize) ]
+		aux, clauses = amoCounts(len(groups), amo, groupSize)
+		return aux + len(groups), clauses + sum( g*(g - 1) // 2 + g for g in groups )
+	if amo == 'product':
+		p = int(math.ceil(math.sqrt(k)))
+		q = int(math.ceil(k / float(p)))
+		auxP, clausesP = amoCounts(p, amo)
+		auxQ, clausesQ = amoCounts(q, amo)
+		return p + q + auxP + auxQ, 2*k + clausesP + clausesQ
+	raise ValueError('unknown at-most-one encoding %r' % (amo,))
+
+def iterUniqueValueCNF(amo='pairwise'):
 	n_sqr = n**2
-	cnf = []
 	
 	for i in range(1, n_sqr+1):
 		for j in range(1, n_sqr+1):
 			# must have a number between 1 and n**2
-			cnf.append( [ v(i, j, d) for d in range(1, n_sqr+1) ] )
+			yield [ v(i, j, d) for d in range(1, n_sqr+1) ]
 				
 			# can't have more than 1 value
-			for d in range(1, n_sqr+1):
-				for dp in range(d+1, n_sqr+1):
-					cnf.append( [ -v(i, j, d), -v(i, j, dp) ] )
+			if amo == 'pairwise':
+				for d in range(1, n_sqr+1):
+					for dp in range(d+1, n_sqr+1):
+						yield [ -v(i, j, d), -v(i, j, dp) ]
+			else:
+				for clause in atMostOne([ v(i, j, d) for d in range(1, n_sqr+1) ], amo):
+					yield clause
+
+def uniqueValueCNF(cnf=None, amo='pairwise'):
+	if cnf is None:
+		cnf = []
+	cnf.extend(iterUniqueValueCNF(amo))
 	return cnf
 
-def validColumnsCNF():
+def iterValidColumnsCNF(amo='pairwise'):
 	n_sqr = n**2
 	
-	cnf = []
+	if amo != 'pairwise':
+		for i in range(1, n_sqr+1):
+			for d in range(1, n_sqr+1):
+				for clause in atMostOne([ v(i, j, d) for j in range(1, n_sqr+1) ], amo):
+					yield clause
+		return
+	
 	for i in range(1, n_sqr+1):
 		for j in range(1, n_sqr+1):
 			for jp in range(j+1, n_sqr+1):
 				for d in range(1, n_sqr+1):
-					cnf.append( [ -v(i, j, d), -v(i, jp, d) ] )
-				
+					yield [ -v(i, j, d), -v(i, jp, d) ]
+
+def validColumnsCNF(cnf=None, amo='pairwise'):
+	if cnf is None:
+		cnf = []
+	cnf.extend(iterValidColumnsCNF(amo))
 	return cnf
 	
-def validRowsCNF():
+def iterValidRowsCNF(amo='pairwise'):
 	n_sqr = n**2
 	
-	cnf = []
+	if amo != 'pairwise':
+		for j in range(1, n_sqr+1):
+			for d in range(1, n_sqr+1):
+				for clause in atMostOne([ v(i, j, d) for i in range(1, n_sqr+1) ], amo):
+					yield clause
+		return
+	
 	for j in range(1, n_sqr+1):
 		for i in range(1, n_sqr+1):
 			for ip in range(i+1, n_sqr+1):
 				for d in range(1, n_sqr+1):
-					cnf.append( [ -v(i, j, d), -v(ip, j, d) ] )
+					yield [ -v(i, j, d), -v(ip, j, d) ]
+
+def validRowsCNF(cnf=None, amo='pairwise'):
+	if cnf is None:
+		cnf = []
+	cnf.extend(iterValidRowsCNF(amo))
 	return cnf
 
-def validGroupCNF():
-	n_sqr = 2**n
-	cnf = []
-	for gi in range(1, n_sqr, n):
-		for gj in range(1, n_sqr, n):
+def iterValidGroupCNF(amo='pairwise'):
+	if amo != 'pairwise':
+		# one at-most-one over the whole group for each digit
+		n_sqr = n**2
+		for gi in range(1, n_sqr+1, n):
+			for gj in range(1, n_sqr+1, n):
+				cells = [ (i, j) for i in range(gi, gi+n) for j in range(gj, gj+n) ]
+				for d in range(1, n_sqr+1):
+					for clause in atMostOne([ v(i, j, d) for i, j in cells ], amo):
+						yield clause
+		return
+	
+	# pairs in the same row or column of a group are already covered by the row and column clauses
+	n_sqr = n**2
+	for gi in range(1, n_sqr+1, n):
+		for gj in range(1, n_sqr+1, n):
 			for i in range(gi, gi+n):
 				for j in range(gj, gj+n):
 					for ip in range(i+1, gi+n):
-						for jp in range(j+1, gj+n):
+						for jp in range(gj, gj+n):
+							if jp == j:
+								continue
 							for d in range(1, n_sqr+1):
-								cnf.append( [ -v(i, j, d), -v(ip, jp, d) ] )
+								yield [ -v(i, j, d), -v(ip, jp, d) ]
+
+def validGroupCNF(cnf=None, amo='pairwise'):
+	if cnf is None:
+		cnf = []
+	cnf.extend(iterValidGroupCNF(amo))
+	return cnf
+
+def iterSymmetryCNF():
+	# pin the first row and column of a blank grid, see symbreak.py
+	for i, j, d in symbreak.pins(n):
+		yield [ v(i+1, j+1, d+1) ]
+
+def iterSudokuClauses(amo='pairwise', symmetry=False):
+	resetAux()
+	for gen in (iterUniqueValueCNF, iterValidColumnsCNF, iterValidRowsCNF, iterValidGroupCNF):
+		for clause in gen(amo):
+			yield clause
+	if symmetry:
+		for clause in iterSymmetryCNF():
+			yield clause
+
+def sudokuClauses(cnf=None, amo='pairwise', symmetry=False):
+	''' amo picks the at-most-one encoding: 'pairwise', 'sequential', 'commander' or 'product'
+		auxiliary variables are numbered from n**6 + 1
+		symmetry pins the first row and column, only for blank grids
+	'''
+	if cnf is None:
+		cnf = []
+	cnf.extend(iterSudokuClauses(amo, symmetry))
 	return cnf
-def sudokuClauses():
-	return uniqueValueCNF() + validColumnsCNF() + validRowsCNF() + validGroupCNF()
+
+def sudokuCounts(amo='pairwise', symmetry=False):
+	''' returns the (variable, clause) counts of sudokuClauses(amo=amo, symmetry=symmetry) without building it
+	'''
+	nVars, clauses = unpinnedCounts(amo)
+	if symmetry:
+		clauses += 2*n**2 - 1
+	return nVars, clauses
+
+def unpinnedCounts(amo):
+	n_sqr = n**2
+	pairs = n_sqr*(n_sqr - 1) // 2
+	
+	if amo == 'pairwise':
+		clauses = n_sqr**2 * (1 + pairs) + 2 * n_sqr * pairs * n_sqr
+		# n**2 groups, each pair of cells in different rows and columns, for every digit
+		clauses += n_sqr * (n_sqr * (n - 1)**2 // 2) * n_sqr
+		return n**6, clauses
 	
+	# n**2 cells, n**2 rows x n**2 digits, n**2 columns x n**2 digits and n**2 groups x n**2 digits
+	aux, clauses = amoCounts(n_sqr, amo)
+	units = 4 * n_sqr**2
+	return n**6 + units*aux, n_sqr**2 + units*clauses
 	
 if __name__ == '__main__':
 	n = 3
@@ -77,18 +264,18 @@ if __name__ == '__main__':
 			sol[i].append(0)
 			
 	clauses = sudokuClauses()
-	start = time.clock()
+	start = clock()
 	sat = pycosat.solve(clauses)
-	t = time.clock() - start
+	t = clock() - start
 	
-	print len(clauses), t
+	print(len(clauses), t)
 	for e in sat:
-		if e > 0:
+		if 0 < e <= n**6:
 			i, j, d = vp(e)
 			sol[i-1][j-1] = d
 	
 	for row in sol:
-		print row
+		print(row)
 
 	
 	
@@ -0,0 +1,25 @@
+''' Symmetry breaking for blank grid generation
+
+	Any valid grid can be relabeled so its first row reads 1..n**2, so pinning the first row
+	never loses satisfiability.  The first column is pinned as well, to the first column of the
+	pattern grid (n*(r%n) + r//n + c) % n**2, which is valid and has that first row.
+	Both only hold for a blank grid, a puzzle with givens must not be pinned.
+'''
+
+def patternValue(n, row, col):
+	''' value (0 based) of the pattern grid at row, col
+	'''
+	return (n*(row % n) + row // n + col) % n**2
+
+def pins(n):
+	''' returns the (row, col, value) cells pinned for an order n blank grid, all 0 based
+	'''
+	n_sqr = n**2
+	cells = [ (0, col, patternValue(n, 0, col)) for col in range(n_sqr) ]
+	cells += [ (row, 0, patternValue(n, row, 0)) for row in range(1, n_sqr) ]
+	return cells
+
+def isBlank(grid):
+	''' True when no cell of grid is given
+	'''
+	return not any( any(row) for row in grid )
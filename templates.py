@@ -0,0 +1,160 @@
+''' Cache of the puzzle independent clauses for each (encoding, n)
+
+	Every solve of an order n puzzle uses the same base clauses, only the givens change.
+	Builders are registered by the encoder modules, the first request for a template builds it
+	and later requests reuse it from an in-memory LRU.  When a cache directory is set the
+	template is also written to disk as a flat int32 literal array plus clause offsets, and
+	memory-mapped from there by later processes instead of being rebuilt.  The file names carry
+	the version of the builder, a hash of formatVersion and of the source of the module that
+	registered it, so a change to the builders makes the old files unused instead of serving
+	stale clauses, and a file whose arrays do not fit together is rebuilt.
+
+	getArrays() hands out those arrays as they are, mapped when they came from disk.  pycosat
+	only takes Python sequences, so getTemplate() converts the arrays to clauses the first time
+	a process asks for them and keeps the result, the mapping saves the construction of the
+	clauses but not that one conversion.
+'''
+import hashlib
+import inspect
+import os
+import numpy as np
+
+from collections import OrderedDict
+
+formatVersion = 1 # of the files in cacheDir, bump when their layout changes
+builders = {} # encoding name -> function(n) returning a list of clauses
+versions = {} # encoding name -> version string in the file names
+maxTemplates = 8 # size of the in-memory LRU
+cacheDir = os.environ.get('SATOKU_TEMPLATE_DIR') # None disables the on-disk cache
+
+_templates = OrderedDict() # (encoding, n) -> [lits, offsets, clauses or None until asked for]
+
+def builderVersion(builder):
+	''' returns a short hash of formatVersion and of the source file of the module defining builder
+	'''
+	digest = hashlib.sha1( ('%d:' % formatVersion).encode('ascii') )
+	path = inspect.getsourcefile(builder)
+	if path is not None:
+		with open(path, 'rb') as f:
+			digest.update(f.read())
+	return digest.hexdigest()[:12]
+
+def register(encoding, builder, version=None):
+	''' registers the function that builds the base clauses of encoding for order n
+		version defaults to builderVersion(builder), pass one when the clauses depend on
+		more than the module of the builder
+	'''
+	builders[encoding] = builder
+	versions[encoding] = version or builderVersion(builder)
+
+def setCacheDir(path):
+	''' sets the directory for on-disk templates, None disables it
+	'''
+	global cacheDir
+	cacheDir = path
+
+def clear():
+	''' empties the in-memory LRU, on-disk templates are left alone
+	'''
+	_templates.clear()
+
+def flatten(clauses):
+	''' converts a list of clauses to a flat int32 literal array and clause offsets
+		clause i is lits[offsets[i]:offsets[i+1]]
+	'''
+	offsets = np.zeros(len(clauses) + 1, dtype=np.int64)
+	offsets[1:] = np.cumsum([len(clause) for clause in clauses])
+	lits = np.fromiter( (l for clause in clauses for l in clause), dtype=np.int32, count=offsets[-1] )
+	return lits, offsets
+
+def unflatten(lits, offsets):
+	''' inverse of flatten(), as a tuple of clause tuples, this copies everything into Python ints
+	'''
+	lits = lits.tolist()
+	offsets = offsets.tolist()
+	return tuple( tuple(lits[offsets[i]:offsets[i+1]]) for i in range(len(offsets) - 1) )
+
+def templatePaths(encoding, n):
+	''' returns the literal and offset file names of a template in cacheDir
+	'''
+	base = os.path.join(cacheDir, '%s-n%d-%s' % (encoding, n, versions[encoding]))
+	return base + '.lits.npy', base + '.offsets.npy'
+
+def saveTemplate(encoding, n, clauses):
+	''' writes a template to cacheDir
+	'''
+	if not os.path.isdir(cacheDir):
+		os.makedirs(cacheDir)
+	lits, offsets = flatten(clauses)
+	litsPath, offsetsPath = templatePaths(encoding, n)
+	# write under a temporary name first so a concurrent reader never maps a partial file
+	for path, array in ( (litsPath, lits), (offsetsPath, offsets) ):
+		tmp = path + '.%d.tmp' % os.getpid()
+		with open(tmp, 'wb') as f:
+			np.save(f, array)
+		os.rename(tmp, path)
+
+def loadTemplate(encoding, n):
+	''' memory-maps the (lits, offsets) arrays of a template from cacheDir, returns None when
+		there is none
+	'''
+	litsPath, offsetsPath = templatePaths(encoding, n)
+	if not (os.path.exists(litsPath) and os.path.exists(offsetsPath)):
+		return None
+	try:
+		lits, offsets = np.load(litsPath, mmap_mode='r'), np.load(offsetsPath, mmap_mode='r')
+	except ValueError:
+		return None
+	# a truncated or mismatched pair is treated as missing and rebuilt
+	if lits.dtype != np.int32 or offsets.dtype != np.int64 or offsets.ndim != 1 or not len(offsets) \
+			or offsets[0] != 0 or offsets[-1] != len(lits):
+		return None
+	return lits, offsets
+
+def _entry(encoding, n):
+	# the LRU entry of a template, loading or building it when it is not there
+	key = (encoding, n)
+	try:
+		entry = _templates.pop(key)
+	except KeyError:
+		entry = None
+		if cacheDir is not None:
+			arrays = loadTemplate(encoding, n)
+			if arrays is not None:
+				entry = [arrays[0], arrays[1], None]
+		if entry is None:
+			clauses = builders[encoding](n)
+			lits, offsets = flatten(clauses)
+			entry = [lits, offsets, tuple( tuple(clause) for clause in clauses )]
+			if cacheDir is not None:
+				saveTemplate(encoding, n, clauses)
+	
+	_templates[key] = entry
+	while len(_templates) > maxTemplates:
+		_templates.popitem(last=False)
+	return entry
+
+def getArrays(encoding, n):
+	''' returns the (lits, offsets) arrays of the base clauses of encoding for order n, read-only
+		memory maps when the template came from cacheDir
+	'''
+	entry = _entry(encoding, n)
+	return entry[0], entry[1]
+
+def getTemplate(encoding, n):
+	''' returns the base clauses of encoding for order n as a tuple of clause tuples
+
+		the clauses are shared between callers, which can not change them, see withUnits for
+		a list to add to
+	'''
+	entry = _entry(encoding, n)
+	if entry[2] is None:
+		entry[2] = unflatten(entry[0], entry[1])
+	return entry[2]
+
+def withUnits(encoding, n, units):
+	''' returns a copy of the template with a unit clause appended for each literal in units
+	'''
+	clauses = list(getTemplate(encoding, n))
+	clauses.extend( [u] for u in units )
+	return clauses
@@ -0,0 +1,33 @@
+import os
+import sys
+
+# the modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import bench
+import pycosatSudoku
+import registry
+
+puzzlePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'puzzles.txt')
+
+@pytest.fixture(scope='session')
+def puzzles():
+	return bench.loadCorpus(puzzlePath)
+
+@pytest.fixture(scope='session')
+def reference(puzzles):
+	# the solutions of the pycosat backend, every solver is checked against them, so they are
+	# checked against the rules first
+	solved = [ pycosatSudoku.solve_grid(grid, backend='pycosat') for grid in puzzles ]
+	for grid, solution in zip(puzzles, solved):
+		assert registry.isSolution(solution, grid)
+	return solved
+
+@pytest.fixture
+def clash(puzzles):
+	# a puzzle with the same digit given twice in its first row
+	grid = [ list(row) for row in puzzles[0] ]
+	grid[0][0] = grid[0][1] = 5
+	return grid
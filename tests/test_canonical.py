@@ -0,0 +1,54 @@
+''' canonical forms and the solution cache built on them, against the pycosat backend
+'''
+import random
+
+import pytest
+
+import canonical
+import generate
+import pycosatSudoku
+import solutioncache
+
+@pytest.fixture
+def cache():
+	# in-memory only, emptied before and after
+	path = solutioncache.cachePath
+	solutioncache.setCachePath(None)
+	solutioncache.clear()
+	yield solutioncache
+	solutioncache.clear()
+	solutioncache.setCachePath(path)
+
+def test_transform_round_trip(puzzles):
+	for grid in puzzles:
+		canon, transform = canonical.canonicalize(grid)
+		assert canonical.apply(transform, grid) == canon
+		assert canonical.inverse(transform, canon) == grid
+
+def test_equivalent_puzzles_share_the_form(puzzles):
+	rng = random.Random(7)
+	for grid in puzzles:
+		key = canonical.key(canonical.canonicalize(grid)[0])
+		for i in range(3):
+			shuffled = generate.shuffleGrid(grid, rng)
+			assert canonical.key(canonical.canonicalize(shuffled)[0]) == key
+
+def test_solutions_match_pycosat(puzzles, reference):
+	for grid, solved in zip(puzzles, reference):
+		canon, transform = canonical.canonicalize(grid)
+		assert canonical.inverse(transform, pycosatSudoku.solve_grid(canon)) == solved
+
+def test_cached_solutions_match_pycosat(cache, puzzles, reference):
+	rng = random.Random(11)
+	for grid, solved in zip(puzzles, reference):
+		assert pycosatSudoku.solve_grid(grid, cached=True) == solved
+		shuffled = generate.shuffleGrid(grid, rng)
+		assert pycosatSudoku.solve_grid(shuffled, cached=True) == pycosatSudoku.solve_grid(shuffled)
+	assert cache.stats['hits'] == len(puzzles)
+
+def test_clashing_givens(cache, clash):
+	canon, transform = canonical.canonicalize(clash)
+	assert canonical.inverse(transform, canon) == clash
+	assert pycosatSudoku.solve_grid(clash, cached=True) is None
+	assert pycosatSudoku.solve_grid(clash, cached=True) is None
+	assert cache.stats['hits'] == 1
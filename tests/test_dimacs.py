@@ -0,0 +1,60 @@
+''' DIMACS export of clause buffers, spilled to disk or not
+'''
+import pycosat
+
+import dimacs
+import satoku
+
+from clausebuffer import SpillBuffer
+
+def test_spilled_buffer_round_trip(tmp_path):
+	cnf = satoku.satokuBuffer(3, encoding='auxiliary')
+	spilled = SpillBuffer(str(tmp_path / 'spill'), spillLiterals=1 << 12)
+	try:
+		spilled.extend(cnf)
+		assert spilled.spilledBytes
+		assert list(spilled) == cnf.toList()
+		path = str(tmp_path / 'satoku.cnf')
+		assert dimacs.writeBuffer(path, spilled) == len(cnf)
+		assert dimacs.readHeader(path) == (cnf.nVars(), len(cnf))
+		assert list(dimacs.readDimacs(path)) == cnf.toList()
+		assert pycosat.solve(spilled) != 'UNSAT'
+	finally:
+		spilled.close()
+
+def test_matches_block_export(tmp_path):
+	cnf = satoku.basicBuffer(2, grid=[ [1, 0, 0, 0], [0, 0, 3, 0], [0, 0, 0, 0], [0, 4, 0, 0] ])
+	a, b = str(tmp_path / 'a.cnf'), str(tmp_path / 'b.cnf')
+	dimacs.writeBuffer(a, cnf)
+	dimacs.writeDimacs(b, dimacs.chunked(cnf.toList()), cnf.nVars(), len(cnf))
+	assert open(a).read() == open(b).read()
+
+# the start and the trailer of a SATLIB uf20 instance, whose clauses end at the '%' line
+satlib = """c This Formular is generated by mcnf
+c
+c    horn? no 
+c    forced? no 
+c    mixed sat? no 
+c    clause length = 3 
+c
+p cnf 5  4 
+ 1 -5 4 0
+-1 5 3 0
+-3 -4 0
+2 0
+%
+0
+
+"""
+
+def test_satlib_trailer(tmp_path, monkeypatch):
+	path = str(tmp_path / 'uf.cnf')
+	with open(path, 'w') as f:
+		f.write(satlib)
+	expected = [ [1, -5, 4], [-1, 5, 3], [-3, -4], [2] ]
+	assert dimacs.readHeader(path) == (5, 4)
+	assert list(dimacs.readDimacs(path)) == expected
+	assert pycosat.solve(dimacs.readDimacs(path)) != 'UNSAT'
+	# chunks that hold the trailer but no comment or header line
+	monkeypatch.setattr(dimacs, 'chunkSize', 8)
+	assert list(dimacs.readDimacs(path)) == expected
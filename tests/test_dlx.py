@@ -0,0 +1,48 @@
+''' the exact cover search of dlx.py against the pycosat backend
+'''
+import pytest
+
+import dlx
+import generate
+import pycosatSudoku
+import registry
+import solutions
+
+def test_solutions_match_pycosat(puzzles, reference):
+	assert [ dlx.solveGrid(grid) for grid in puzzles ] == reference
+
+def test_puzzles_are_unique(puzzles):
+	for grid in puzzles:
+		assert len(dlx.sudokuCover(grid).search(2)) == 1
+
+def test_clashing_givens(clash):
+	assert dlx.sudokuCover(clash) is None
+	assert dlx.solveGrid(clash) is None
+
+@pytest.mark.parametrize('n', [2, 3, 4])
+def test_blank_grids(n):
+	blank = [ [0]*n**2 for r in range(n**2) ]
+	assert registry.isSolution(dlx.solveGrid(blank, symmetry=True), blank)
+
+def test_select_and_hide_are_undone(puzzles, reference):
+	cover = dlx.ExactCover(4*3**4, dlx.sudokuRows(3))
+	links = (cover.L[:], cover.R[:], cover.U[:], cover.D[:], cover.S[:])
+	grid, solved = puzzles[-1], reference[-1]
+	for r, row in enumerate(grid):
+		for c, val in enumerate(row):
+			if val:
+				assert cover.select(dlx.candidate(3, r, c, val - 1))
+	assert dlx.readSolution(3, cover.search(1)[0]) == solved
+	# without its value in the first blank cell the puzzle has no solution
+	r, c = next( (r, c) for r in range(9) for c in range(9) if not grid[r][c] )
+	cover.hide(dlx.candidate(3, r, c, solved[r][c] - 1))
+	assert cover.search(1) == []
+	cover.unhide(dlx.candidate(3, r, c, solved[r][c] - 1))
+	while cover.selected:
+		cover.deselect()
+	assert (cover.L, cover.R, cover.U, cover.D, cover.S) == links
+
+def test_generated_puzzles_are_unique():
+	puzzle, solution = generate.generate(3, seed=5)
+	assert solutions.countSolutions(puzzle, 2, 'weber') == 1
+	assert pycosatSudoku.solve_grid(puzzle) == solution
@@ -0,0 +1,37 @@
+''' lazily added satoku / basic constraints of lazy.py against the pycosat backend
+'''
+import pytest
+
+import lazy
+import pycosatSudoku
+import registry
+import satoku
+
+@pytest.mark.parametrize('model', ['satoku', 'basic'])
+def test_solutions_match_pycosat(puzzles, reference, model):
+	assert [ lazy.lazySolve(grid, model) for grid in puzzles ] == reference
+
+@pytest.mark.parametrize('granularity', ['pair', 'sector'])
+def test_granularity(puzzles, reference, granularity):
+	grid = puzzles[-1]
+	assert lazy.lazySolve(grid, 'satoku', 'auxiliary', granularity) == reference[-1]
+
+def test_final_formula_is_smaller(puzzles):
+	stats = {}
+	lazy.lazySolve(puzzles[-1], 'satoku', stats=stats)
+	assert stats['clauses'] == stats['initialClauses'] + stats['addedClauses']
+	assert stats['clauses'] < stats['fullClauses']
+	# both count the unit clauses of the givens
+	assert stats['fullClauses'] == len(satoku.satokuBuffer(3, grid=puzzles[-1]))
+
+@pytest.mark.parametrize('model', ['satoku', 'basic'])
+def test_clashing_givens(clash, model):
+	assert lazy.lazySolve(clash, model) is None
+
+@pytest.mark.parametrize('model', ['satoku', 'basic'])
+def test_symmetry_pins_blank_grids(model):
+	blank = [ [0]*4 for r in range(4) ]
+	solved = lazy.solveGrid(blank, model, symmetry=True)
+	assert registry.isSolution(solved, blank)
+	assert solved[0] == [1, 2, 3, 4]
+	assert pycosatSudoku.solve_grid(blank, symmetry=True, backend='lazy') == solved
@@ -0,0 +1,22 @@
+''' the portfolio race of portfolio.py against the pycosat backend
+'''
+import portfolio
+import pycosatSudoku
+import registry
+
+def test_race_matches_pycosat(puzzles, reference):
+	solved, winner, seconds = portfolio.race(puzzles[-1])
+	assert solved == reference[-1]
+	assert winner in portfolio.defaultEncodings
+
+def test_solve_many_runs_the_race_in_process(puzzles, reference):
+	# pool workers are daemonic and may not start the racing processes
+	assert list(pycosatSudoku.solve_many(puzzles[:3], workers=2, backend='portfolio')) == reference[:3]
+
+def test_clashing_givens(clash):
+	assert portfolio.solveGrid(clash) is None
+
+def test_every_default_encoding_solves(puzzles, reference):
+	# each contestant on its own, so a broken one can not hide behind a faster one
+	for encoding in portfolio.defaultEncodings:
+		assert registry.solve(encoding, puzzles[-1]) == reference[-1]
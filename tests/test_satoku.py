@@ -0,0 +1,90 @@
+''' the handle based satoku and basic builders of satoku.py against the pycosat backend
+'''
+import pickle
+import pycosat
+import pytest
+
+import buildstats
+import parallelbuild
+import satoku
+
+builders = {'satoku': satoku.satokuCNF, 'basic': satoku.basicCNF}
+
+@pytest.mark.parametrize('model', sorted(builders))
+def test_solutions_match_pycosat(puzzles, reference, model):
+	grid, solved = puzzles[-1], reference[-1]
+	encoder = satoku.Encoder(model, 3)
+	cnf = builders[model](3, encoder=encoder, grid=grid)
+	assert [ [ val + 1 for val in row ] for row in encoder.decode(pycosat.solve(cnf)) ] == solved
+
+@pytest.mark.parametrize('model', sorted(builders))
+def test_builders_leave_the_default_encoder(model):
+	default = satoku.defaultEncoder
+	handles = list(default.lid)
+	builders[model](2, encoding='auxiliary')
+	assert satoku.defaultEncoder is default
+	assert default.lid == handles
+
+@pytest.mark.parametrize('model', sorted(builders))
+def test_clashing_givens(clash, model):
+	assert pycosat.solve(builders[model](3, grid=clash)) == 'UNSAT'
+
+@pytest.mark.parametrize('model', sorted(builders))
+def test_parallel_build_takes_the_givens(puzzles, model):
+	grid = puzzles[-1]
+	stats = buildstats.BuildStats(memory=False)
+	cnf = satoku.buildBuffer(3, model, 'auxiliary', stats=stats, workers=2, grid=grid)
+	assert cnf.toList() == satoku.buildBuffer(3, model, 'auxiliary', grid=grid).toList()
+	assert stats.order == ['build']
+	assert stats.phases['build']['clauses'] == len(cnf)
+
+@pytest.mark.parametrize('model', sorted(builders))
+@pytest.mark.parametrize('symmetry', [False, True])
+def test_estimate_counts_the_givens(puzzles, model, symmetry):
+	grid = puzzles[-1]
+	size = satoku.estimate(3, model, 'auxiliary', symmetry, grid=grid)
+	cnf = satoku.buildBuffer(3, model, 'auxiliary', symmetry, grid=grid)
+	assert (size['clauses'], size['literals'], size['variables']) == (len(cnf), cnf.nLiterals, cnf.nVars())
+
+@pytest.mark.parametrize('model', sorted(builders))
+def test_puzzle_in_place_of_cnf(puzzles, model):
+	grid = [ list(row) for row in puzzles[-1] ]
+	with pytest.raises(TypeError):
+		builders[model](3, grid)
+	assert grid == puzzles[-1]
+	# the clause list still goes second
+	cnf = [ [1, 2] ]
+	assert builders[model](3, cnf, grid=grid) is cnf
+	assert len(cnf) > 1 and cnf[0] == [1, 2]
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parallel_build_keeps_no_maps(workers):
+	before = dict(parallelbuild._maps)
+	cnf = parallelbuild.parallelBuffer(2, 'satoku', workers=workers)
+	assert parallelbuild._maps == before
+	assert cnf.toList() == satoku.buildBuffer(2, 'satoku').toList()
+
+@pytest.mark.parametrize('model', sorted(builders))
+def test_encoders_pickle(puzzles, reference, model):
+	grid, solved = puzzles[-1], [ [ val - 1 for val in row ] for row in reference[-1] ]
+	encoder = satoku.Encoder(model, 3)
+	cnf = builders[model](3, encoder=encoder, grid=grid)
+	copy = pickle.loads(pickle.dumps(encoder))
+	assert copy.lid == encoder.lid and copy.id == encoder.id
+	assert copy.decode(pycosat.solve(cnf)) == solved
+
+	layout = satoku.Encoder.layout(model, 3)
+	cnf = satoku.buildBuffer(3, model, grid=grid).toList()
+	assert pickle.loads(pickle.dumps(layout)).decode(pycosat.solve(cnf)) == solved
+
+def test_legacy_decoders(monkeypatch, puzzles, reference):
+	grid, solved = puzzles[-1], [ [ val - 1 for val in row ] for row in reference[-1] ]
+	monkeypatch.setattr(satoku, 'defaultEncoder', satoku.Encoder())
+	model = pycosat.solve(satoku.satokuCNF(3, grid=grid))
+	with pytest.raises(ValueError):
+		satoku.satToSatoku(model, 3)
+	with pytest.raises(ValueError):
+		satoku.satToSud(model, 3)
+	# the default encoder set to the block layout decodes the buffers
+	satoku.setHandleLayout(satoku.satokuHandles(3), 2*satoku.countBits(3))
+	assert satoku.satToSatoku(pycosat.solve(satoku.buildBuffer(3, grid=grid).toList()), 3) == solved
@@ -0,0 +1,107 @@
+''' the JSON lines service of server.py, run in a thread of its own on a Unix socket
+'''
+import asyncio
+import contextlib
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import bench
+import server
+
+# a blank 25x25 grid keeps the lazy backend busy for well over a minute
+slow = {'puzzle': [ [0]*25 for i in range(25) ], 'backend': 'lazy'}
+
+@contextlib.contextmanager
+def running(path, **options):
+	ready = threading.Event()
+	state = {}
+	async def main():
+		state['loop'], state['task'] = asyncio.get_event_loop(), asyncio.current_task()
+		await server.serve(path, ready=lambda listener: ready.set(), **options)
+	def run():
+		# asyncio.run cancels the connections still open once serve is cancelled
+		try:
+			asyncio.run(main())
+		except asyncio.CancelledError:
+			pass
+	thread = threading.Thread(target=run)
+	thread.start()
+	try:
+		assert ready.wait(60)
+		yield path
+	finally:
+		state['loop'].call_soon_threadsafe(state['task'].cancel)
+		thread.join(60)
+
+@pytest.fixture
+def path(tmp_path):
+	# a client that gets no answer fails the test instead of hanging it
+	timeout = socket.getdefaulttimeout()
+	socket.setdefaulttimeout(30)
+	yield str(tmp_path / 'satoku.sock')
+	socket.setdefaulttimeout(timeout)
+
+def test_protocol(path, puzzles, reference):
+	with running(path, workers=2):
+		answers = server.request([
+			{'id': 1, 'puzzle': bench.formatPuzzle(puzzles[0])},
+			{'id': 2, 'puzzle': puzzles[1], 'backend': 'pycosat', 'cached': True},
+			{'id': 3, 'puzzle': 'not a puzzle'},
+			{'id': 4, 'puzzle': puzzles[0], 'backend': 'nonesuch'},
+			[1, 2],
+		], path)
+	byId = dict( (answer.get('id'), answer) for answer in answers )
+	assert byId[1]['status'] == 'solved' and byId[1]['solution'] == bench.formatPuzzle(reference[0])
+	assert byId[2]['status'] == 'solved' and byId[2]['solution'] == reference[1]
+	assert byId[3]['status'] == 'invalid'
+	assert byId[4]['status'] == 'error'
+	assert byId[None]['status'] == 'error'
+	assert all( 'queued' in byId[i] and 'seconds' in byId[i] for i in (1, 2, 3) )
+
+def test_warm_follows_the_backend():
+	assert server.Server().warm == ()
+	assert server.Server(backend='pycosat').warm == (('weber', 3),)
+	assert server.Server(backend='satoku', warm=(('basic', 2),)).warm == (('basic', 2),)
+
+def test_stats(path, puzzles):
+	with running(path, workers=1, queueSize=8):
+		server.request([ {'puzzle': bench.formatPuzzle(grid)} for grid in puzzles[:3] ], path)
+		stats, = server.request([ {'id': 's', 'op': 'stats'} ], path)
+	assert stats['id'] == 's'
+	assert stats['queueDepth'] == 0 and stats['queueSize'] == 8 and stats['inFlight'] == 0
+	assert stats['workers'] == 1 and stats['recycled'] == 0
+	assert stats['counts'] == {'solved': 3}
+	assert 'latency' in stats
+
+def test_timeout_recycles_the_worker(path, puzzles, reference):
+	with running(path, workers=1, grace=0.2):
+		answer, = server.request([ dict(slow, timeout=0.2) ], path)
+		assert answer['status'] == 'timeout'
+		# the only worker is replaced instead of finishing the blank grid
+		solved, = server.request([ {'puzzle': puzzles[0]} ], path)
+		stats, = server.request([ {'op': 'stats'} ], path)
+	assert solved['solution'] == reference[0]
+	assert stats['recycled'] == 1 and stats['counts']['timeout'] == 1
+
+def test_slow_reader(path, puzzles, reference):
+	# a client that reads none of its answers, the stats fill the socket buffers at once so
+	# the answers of its puzzles are written to a full socket
+	job = json.dumps({'puzzle': bench.formatPuzzle(puzzles[0])}) + '\n'
+	stats = json.dumps({'op': 'stats'}) + '\n'
+	stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	def flood():
+		try:
+			stalled.sendall( ((job + stats*20) * 500).encode('utf8') )
+		except OSError:
+			pass # closed below, while the server no longer reads it
+	with running(path, workers=1, queueSize=4):
+		stalled.connect(path)
+		threading.Thread(target=flood, daemon=True).start()
+		time.sleep(1)
+		answer, = server.request([ {'puzzle': puzzles[1]} ], path)
+		stalled.close()
+	assert answer['solution'] == reference[1]
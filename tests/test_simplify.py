@@ -0,0 +1,54 @@
+''' the given-aware reduction of simplify.py against the unreduced formulas
+'''
+import random
+
+import pycosat
+
+import decode
+import pycosatSudoku
+import simplify
+
+def satisfies(model, clauses):
+	true = set(model)
+	return all( any( l in true for l in clause ) for clause in clauses )
+
+def test_sudoku_models_match_unreduced(puzzles):
+	base = [ list(clause) for clause in pycosatSudoku.sudoku_clauses() ]
+	index = simplify.buildIndex(base)
+	for grid in puzzles:
+		units = pycosatSudoku.given_literals(grid)
+		full = pycosat.solve(base + [ [l] for l in units ])
+		cnf, names, value = simplify.reduceCNF(base, units, index)
+		assert len(cnf) < len(base)
+		model = simplify.expandModel(pycosat.solve(cnf), names, value)
+		assert satisfies(model, base)
+		assert set(units) <= set(model)
+		# the puzzles are unique, so both models are the same grid
+		assert (decode.decodeOneHot(model, 3) == decode.decodeOneHot(full, 3)).all()
+
+def test_conflicting_givens_are_unsat(clash):
+	base = [ list(clause) for clause in pycosatSudoku.sudoku_clauses() ]
+	units = pycosatSudoku.given_literals(clash)
+	assert pycosat.solve(base + [ [l] for l in units ]) == 'UNSAT'
+	assert simplify.reduceCNF(base, units) is None
+
+def test_random_formulas_keep_satisfiability():
+	rng = random.Random(3)
+	for trial in range(200):
+		nVars = rng.randint(3, 8)
+		clauses = [ [ rng.choice((1, -1)) * v for v in rng.sample(range(1, nVars + 1), rng.randint(1, 3)) ] for i in range(rng.randint(2, 20)) ]
+		units = [ rng.choice((1, -1)) * v for v in rng.sample(range(1, nVars + 1), rng.randint(0, 3)) ]
+		full = pycosat.solve(clauses + [ [l] for l in units ])
+		reduced = simplify.reduceCNF(clauses, units)
+		if reduced is None:
+			assert full == 'UNSAT'
+			continue
+		cnf, names, value = reduced
+		model = pycosat.solve(cnf)
+		assert (model == 'UNSAT') == (full == 'UNSAT')
+		if model != 'UNSAT':
+			expanded = simplify.expandModel(model, names, value)
+			# variables the reduced formula no longer mentions are free, either value works
+			free = [ v for v in range(1, nVars + 1) if v not in value and v not in names ]
+			assigned = expanded + free
+			assert satisfies(assigned, clauses + [ [l] for l in units ])
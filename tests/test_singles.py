@@ -0,0 +1,27 @@
+''' batch propagation of singles.py against the pycosat backend
+'''
+import numpy as np
+
+import singles
+
+def test_solutions_match_pycosat(puzzles, reference):
+	stats = {}
+	assert singles.solveBatch(puzzles, stats=stats) == reference
+	assert stats['propagated'] + stats['sat'] == len(puzzles)
+	assert not stats['unsolvable']
+
+def test_propagation_keeps_the_givens(puzzles, reference):
+	filled, status = singles.propagateBatch(puzzles)
+	givens = np.asarray(puzzles) > 0
+	assert (filled[givens] == np.asarray(puzzles)[givens]).all()
+	# every forced cell agrees with the solution
+	forced = filled > 0
+	assert (filled[forced] == np.asarray(reference)[forced]).all()
+	assert ( (status == singles.SOLVED) == forced.all(axis=(1, 2)) ).all()
+
+def test_clashing_givens(puzzles, reference, clash):
+	filled, status = singles.propagateBatch([clash, puzzles[0]])
+	assert status[0] == singles.UNSOLVABLE
+	assert not filled[0].any()
+	assert status[1] != singles.UNSOLVABLE
+	assert singles.solveBatch([clash, puzzles[0]]) == [None, reference[0]]
@@ -0,0 +1,27 @@
+''' the streaming command line solver of solve.py against the pycosat backend
+'''
+import pytest
+
+import bench
+import solve
+
+@pytest.fixture
+def lines(puzzles, monkeypatch):
+	# several batches, each ahead of the output by at most solve.window
+	monkeypatch.setattr(solve, 'batchSize', 4)
+	return [ bench.formatPuzzle(grid) for grid in puzzles ] + ['not a puzzle']
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('propagate', [False, True])
+def test_solutions_match_pycosat(lines, reference, workers, propagate):
+	out = [ solution for solution, seconds in solve.solveLines(iter(lines), 'dlx', workers, 2, propagate=propagate) ]
+	assert out == [ bench.formatPuzzle(grid) for grid in reference ] + ['invalid']
+
+def test_portfolio_solves_in_process(lines, reference):
+	out = [ solution for solution, seconds in solve.solveLines(iter(lines[:3]), 'portfolio', workers=2) ]
+	assert out == [ bench.formatPuzzle(grid) for grid in reference[:3] ]
+
+def test_stopping_early(lines):
+	solved = solve.solveLines(iter(lines), workers=2)
+	next(solved)
+	solved.close()
@@ -0,0 +1,38 @@
+''' the one-hot model of sud.py under every at-most-one encoding
+'''
+import pycosat
+import pytest
+
+import decode
+import registry
+import sud
+
+@pytest.fixture
+def order():
+	# sud.py builds for its module level n
+	yield lambda n: setattr(sud, 'n', n)
+	sud.n = 3
+
+@pytest.mark.parametrize('amo', sorted(sud.amoEncodings))
+@pytest.mark.parametrize('n', [2, 3])
+def test_counts_match_clauses(order, amo, n):
+	order(n)
+	clauses = sud.sudokuClauses(amo=amo)
+	nVars, nClauses = sud.sudokuCounts(amo)
+	assert len(clauses) == nClauses
+	assert max( abs(l) for clause in clauses for l in clause ) == nVars
+
+@pytest.mark.parametrize('amo', sorted(sud.amoEncodings))
+@pytest.mark.parametrize('n', [2, 3])
+def test_solution_is_valid(order, amo, n):
+	order(n)
+	model = pycosat.solve(sud.sudokuClauses(amo=amo))
+	solved = decode.decodeOneHot(model, n).tolist()
+	assert registry.isSolution(solved, [ [0]*n**2 for r in range(n**2) ])
+
+@pytest.mark.parametrize('amo', sorted(sud.amoEncodings))
+def test_box_conflict_is_unsat(order, amo):
+	# the same digit twice in a box, in different rows and columns on an anti-diagonal
+	order(3)
+	clauses = sud.sudokuClauses(amo=amo) + [ [sud.v(1, 3, 5)], [sud.v(2, 1, 5)] ]
+	assert pycosat.solve(clauses) == 'UNSAT'
@@ -0,0 +1,54 @@
+''' the in-memory and on-disk template cache of templates.py
+'''
+import os
+
+import numpy as np
+import pytest
+
+import satoku
+import templates
+
+@pytest.fixture
+def cache(tmp_path):
+	# a fresh cache directory and LRU, and the registry restored afterwards
+	path, builders, versions = templates.cacheDir, dict(templates.builders), dict(templates.versions)
+	templates.setCacheDir(str(tmp_path))
+	templates.clear()
+	yield str(tmp_path)
+	templates.setCacheDir(path)
+	templates.clear()
+	templates.builders.clear()
+	templates.builders.update(builders)
+	templates.versions.clear()
+	templates.versions.update(versions)
+
+def test_disk_round_trip(cache):
+	built = templates.getTemplate('satoku', 2)
+	assert all( os.path.exists(path) for path in templates.templatePaths('satoku', 2) )
+	templates.clear()
+	lits, offsets = templates.getArrays('satoku', 2)
+	assert isinstance(lits, np.memmap)
+	templates.clear()
+	assert templates.getTemplate('satoku', 2) == built == tuple( tuple(c) for c in satoku.satokuBuffer(2).toList() )
+
+def test_builder_change_skips_old_files(cache):
+	templates.register('test', lambda n: [ [1, 2], [-1] ], version='a')
+	assert templates.getTemplate('test', 2) == ( (1, 2), (-1,) )
+	# a changed builder has another version, the file of the old one is not read
+	templates.register('test', lambda n: [ [3] ], version='b')
+	templates.clear()
+	assert templates.getTemplate('test', 2) == ( (3,), )
+	assert len(os.listdir(cache)) == 4
+
+def test_mismatched_files_are_rebuilt(cache):
+	templates.register('test', lambda n: [ [1, 2], [-1] ], version='a')
+	templates.getTemplate('test', 2)
+	litsPath, offsetsPath = templates.templatePaths('test', 2)
+	np.save(litsPath, np.array([1, 2], dtype=np.int32))
+	templates.clear()
+	assert templates.loadTemplate('test', 2) is None
+	assert templates.getTemplate('test', 2) == ( (1, 2), (-1,) )
+
+def test_version_follows_the_builder_source():
+	assert templates.versions['satoku'] == templates.builderVersion(satoku.satokuBuffer)
+	assert templates.versions['satoku'] != templates.versions['weber']